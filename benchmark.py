@@ -0,0 +1,290 @@
+import os
+import json
+import time
+import tracemalloc
+import numpy as np
+import mice
+from maze import Maze
+from controller import Controller
+from graph import Graph
+from heading import Heading
+from rotation import Rotation
+from state import State
+from phase import Phase
+
+class Benchmark:
+    # Games are played on each bundled maze, and the component benchmarks use the largest.
+    MAZES = tuple(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mazes', f) for f in ('maze_01.txt', 'maze_02.txt', 'maze_03.txt'))
+
+    # The stored baseline, next to this module.
+    BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks.json')
+
+    # Every mouse starts in the same corner, as in robomouse.
+    INIT_STATE = { 'pos': [0, 0], 'heading': Heading.NORTH }
+
+    # Inputs are cycled through by the component benchmarks.
+    INPUTS = 1000
+
+    # Units of work to measure memory over, fewer for games as tracing is slow.
+    ALLOC_UNITS = 100
+    GAME_ALLOC_UNITS = 3
+
+    def __init__(self, seconds=0.5, repeats=5, seed=0):
+        """Measures the throughput and peak memory of the simulator's hot paths.
+
+        Each case is timed over several repeats of the same work and the best
+        rate is kept, so one noisy repeat doesn't make a case look slower.
+        Memory is measured separately with tracemalloc, as tracing slows the
+        case down.
+
+        Arguments:
+            seconds -- the time to spend timing each case.
+            repeats -- the number of timed repeats per case.
+            seed -- seeds the inputs and the mice, so every run benchmarks the same work.
+        """
+        self.seconds = seconds
+        self.repeats = repeats
+        self.seed = seed
+        self.mazes = { os.path.basename(f).partition('.')[0]: Maze(f) for f in self.MAZES }
+
+    def cases(self, mouse_names):
+        """Lists the benchmark cases.
+
+        Each case has a factory that makes a function, which does the case's
+        units of work in the same order every time it's made. Each call does
+        one unit and returns the number of steps it took, which is 1 for the
+        components and every controller step for a game. Cases also give the
+        number of units to measure their memory over.
+
+        Arguments:
+            mouse_names -- the names of mouse classes in 'mice' to play games with.
+        Returns:
+            a dict of case name to (factory, units) tuples.
+        """
+        maze = self.mazes[max(self.mazes, key=lambda m: self.mazes[m].dim)]
+        rng = np.random.default_rng(self.seed)
+        headings = list(Heading)
+        rotations = list(Rotation)
+
+        # Random poses and moves to cycle through.
+        positions = [list(p) for p in rng.integers(0, maze.dim, (self.INPUTS, 2))]
+        pose_headings = [headings[i] for i in rng.integers(0, 4, self.INPUTS)]
+        pose_rotations = [rotations[i] for i in rng.integers(0, 3, self.INPUTS)]
+        moves = [int(m) for m in rng.integers(-3, 4, self.INPUTS)]
+        poses = list(zip(positions, pose_headings, pose_rotations, moves))
+
+        # Random routes through a graph of every square in the maze.
+        graph = Benchmark.maze_graph(maze)
+        nodes = list(graph.nodes)
+        routes = [(nodes[a], nodes[b]) for a, b in rng.integers(0, len(nodes), (self.INPUTS, 2))]
+        heuristic = lambda a, b: abs(a % maze.dim - b % maze.dim) + abs(a // maze.dim - b // maze.dim)
+
+        # States aren't checked against the maze, so they can wander anywhere.
+        state = State([maze.dim // 2, maze.dim // 2], Heading.NORTH)
+
+        cases = {
+            'maze.sensor_readings': (Benchmark.cycle(poses, lambda p: maze.sensor_readings(p[0], p[1])), self.ALLOC_UNITS),
+            'maze.valid_move': (Benchmark.cycle(poses, lambda p: maze.valid_move(p[0], p[1], p[3])), self.ALLOC_UNITS),
+            'state.update': (Benchmark.cycle(poses, lambda p: state.update(p[2], p[3])), self.ALLOC_UNITS),
+            'heading.rotate': (Benchmark.cycle(poses, lambda p: p[1].rotate(p[2])), self.ALLOC_UNITS),
+            'graph.shortest_path': (Benchmark.cycle(routes, lambda r: graph.shortest_path(r[0], r[1], heuristic)), self.ALLOC_UNITS)
+        }
+
+        # Full headless games.
+        for mouse_name in mouse_names:
+            for maze_name, maze in self.mazes.items():
+                cases[f"game.{mouse_name}.{maze_name}"] = (self.game(mice.get_mouse(mouse_name), maze), self.GAME_ALLOC_UNITS)
+
+        return cases
+
+    def cycle(inputs, func):
+        """Makes a case that calls a function with each input in turn.
+        """
+        def factory():
+            state = { 'i': 0 }
+            def step():
+                func(inputs[state['i']])
+                state['i'] = (state['i'] + 1) % len(inputs)
+                return 1
+            return step
+
+        return factory
+
+    def game(self, mouse_class, maze):
+        """Makes a case that plays a game with each seed in turn, returning the steps taken.
+        """
+        controller = Controller(mouse_class, maze, self.INIT_STATE, max_steps=1000, delay=0, verbose=False)
+        def factory():
+            state = { 'seed': self.seed }
+            def step():
+                controller.rng = np.random.default_rng(state['seed'])
+                state['seed'] += 1
+                controller.run_normal()
+
+                # Step counters start from -1, and the execution counter is
+                # only reset once execution starts.
+                steps = controller.steps[Phase.PLAN.value] + 1
+                if controller.phase == Phase.EXECUTE:
+                    steps += controller.steps[Phase.EXECUTE.value] + 1
+                return int(steps)
+            return step
+
+        return factory
+
+    def check_restore(self, mouse_names, runs=3):
+        """Checks that mice restored from their snapshot play the same games as new mice.
+
+        Each seed is played by a controller that's been reused since the first
+        seed, so its mouse is restored, and by a new controller, which builds
+        a new mouse, and every move of both phases is compared. A restored
+        mouse that raises an error counts as playing differently.
+
+        Arguments:
+            mouse_names -- the names of mouse classes in 'mice' to check. Mice
+                without 'snapshot' and 'restore' are skipped.
+            runs -- the number of seeds to play.
+        Returns:
+            a list of the names of mice whose restored games differed.
+        """
+        maze = self.mazes[max(self.mazes, key=lambda m: self.mazes[m].dim)]
+        failed = []
+        for mouse_name in mouse_names:
+            mouse_class = mice.get_mouse(mouse_name)
+            if not (hasattr(mouse_class, 'snapshot') and hasattr(mouse_class, 'restore')):
+                continue
+
+            reused = Controller(mouse_class, maze, self.INIT_STATE, max_steps=1000, delay=0, verbose=False, track_regret=True)
+            for seed in range(self.seed, self.seed + runs):
+                fresh = Controller(mouse_class, maze, self.INIT_STATE, max_steps=1000, delay=0, verbose=False, track_regret=True)
+
+                # A mouse left in a bad state by 'restore' often fails outright.
+                try:
+                    restored_game = Benchmark.play(reused, seed)
+                except Exception:
+                    restored_game = None
+                if restored_game != Benchmark.play(fresh, seed):
+                    failed.append(mouse_name)
+                    break
+
+        return failed
+
+    def play(controller, seed):
+        """Plays a seeded game, returning its score and every move of both phases.
+        """
+        controller.rng = np.random.default_rng(seed)
+        controller.run_normal()
+        moves = [(phase, tuple(r['pos']), r['heading'], r['rot'], r['move']) for phase in Phase for r in controller.regrets[phase]]
+
+        return controller.score(), moves
+
+    def maze_graph(maze):
+        """Builds a graph with a node for each square of a maze, joined to its open neighbours.
+
+        Nodes are numbered x + dim * y, as in AStarMouse.
+        """
+        graph = Graph()
+        for x in range(maze.dim):
+            for y in range(maze.dim):
+                graph.add_node(x + maze.dim * y)
+        for x in range(maze.dim):
+            for y in range(maze.dim):
+                if maze.is_permissible([x, y], Heading.EAST):
+                    graph.add_edge(x + maze.dim * y, x + 1 + maze.dim * y, 1, Heading.EAST)
+                if maze.is_permissible([x, y], Heading.NORTH):
+                    graph.add_edge(x + maze.dim * y, x + maze.dim * (y + 1), 1, Heading.NORTH)
+
+        return graph
+
+    def measure(self, factory, units):
+        """Measures a case's peak memory and times it.
+
+        Every repeat times the same units of work, as many as fit in its
+        share of the time, and the fastest repeat is kept, as slower ones were
+        slowed by something else on the machine.
+
+        Arguments:
+            factory -- the case's factory.
+            units -- the number of units to measure memory over.
+        Returns:
+            a dict with the best 'steps_per_s' over the repeats and the
+            'peak_bytes', the most memory held above the start of a unit of
+            work while it runs, averaged over the units. It's the memory a
+            call or a whole game needs at once, not the bytes allocated, as
+            memory freed during the unit is reused.
+        """
+        # Measure the memory held at the peak of each unit of work.
+        step = factory()
+        tracemalloc.start()
+        peaks = 0
+        for _ in range(units):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            step()
+            peaks += tracemalloc.get_traced_memory()[1] - before
+        tracemalloc.stop()
+        peak_bytes = peaks / units
+
+        # Find how many units fit in a repeat.
+        step = factory()
+        n = 0
+        deadline = time.perf_counter() + self.seconds / self.repeats
+        while n == 0 or time.perf_counter() < deadline:
+            step()
+            n += 1
+
+        # Time the repeats.
+        rates = []
+        for _ in range(self.repeats):
+            step = factory()
+            steps = 0
+            start = time.perf_counter()
+            for _ in range(n):
+                steps += step()
+            rates.append(steps / (time.perf_counter() - start))
+
+        return { 'steps_per_s': max(rates), 'peak_bytes': peak_bytes }
+
+    def run(self, mouse_names, pattern=None):
+        """Runs the benchmark cases.
+
+        Arguments:
+            mouse_names -- the names of mouse classes in 'mice' to play games with.
+            pattern -- only runs cases whose names start with this, if given.
+        Returns:
+            a dict of case name to its measurements.
+        """
+        return { name: self.measure(*case) for name, case in self.cases(mouse_names).items() if pattern is None or name.startswith(pattern) }
+
+    def compare(results, baseline, tolerance):
+        """Finds the cases that have regressed against a baseline.
+
+        Arguments:
+            results -- the measurements from 'run'.
+            baseline -- measurements saved from an earlier run.
+            tolerance -- the fraction a case can slow down, or need more memory, by.
+        Returns:
+            a list of dicts with the 'case', 'metric', 'baseline' and 'value'.
+        """
+        regressions = []
+        for case, result in results.items():
+            if case not in baseline:
+                continue
+            old = baseline[case]
+            if result['steps_per_s'] < old['steps_per_s'] * (1 - tolerance):
+                regressions.append({ 'case': case, 'metric': 'steps_per_s', 'baseline': old['steps_per_s'], 'value': result['steps_per_s'] })
+            if 'peak_bytes' in old and result['peak_bytes'] > old['peak_bytes'] * (1 + tolerance):
+                regressions.append({ 'case': case, 'metric': 'peak_bytes', 'baseline': old['peak_bytes'], 'value': result['peak_bytes'] })
+
+        return regressions
+
+    def load(filename):
+        """Loads a saved baseline.
+        """
+        with open(filename) as f_in:
+            return json.load(f_in)
+
+    def save(results, filename):
+        """Saves measurements as a baseline.
+        """
+        with open(filename, 'w') as f_out:
+            json.dump(results, f_out, indent=1, sort_keys=True)
@@ -1,7 +1,6 @@
 import time
-import pdb
 import numpy as np
-import copy
+import log
 from heading import Heading
 from rotation import Rotation
 from state import State
@@ -10,17 +9,28 @@ from phase import Phase
 class Controller:
     MAX_STEPS = 3 
 
-    def __init__(self, mouse, maze, init_state, max_steps=10, delay=1000, pause=False, verbose=True):
+    def __init__(self, mouse_class, maze, init_state, max_steps=10, delay=1000, pause=False, verbose=True, track_regret=False, mouse_args=None, fps=None):
         """Creates a maze game controller.
 
+        A new mouse is built from the class for every run, so no state
+        persists between runs. Mice that implement 'snapshot' and 'restore'
+        are built once, and restored to their new state before each run.
+
         Arguments:
-            mouse -- the Mouse who will navigate the maze.
+            mouse_class -- the class of Mouse who will navigate the maze, or
+                None if moves are passed to 'end_step' instead.
             maze -- the Maze to navigate.
             init_state -- the mouse's starting state.
             max_steps -- the maximum number of steps per phase.
             delay -- the delay in ms between steps.
             pause -- should we pause before runs.
-            verbose -- prints info to the command line.
+            verbose -- passed to the mouse.
+            track_regret -- records how many steps each move wasted.
+            mouse_args -- the mouse's constructor arguments, defaults to
+                (maze.dim, init_state, verbose).
+            fps -- in display mode, play steps as fast as possible and redraw
+                this many times a second instead of after every step. The
+                delay is ignored.
         """
         # Create mouse's state.
         self.mouse_state = State(init_state['pos'], init_state['heading'])
@@ -28,16 +38,28 @@ class Controller:
         # Validate the initial state.
         self.validate_state(self.mouse_state.pos, self.mouse_state.heading, maze)
 
-        # Keep record of mouse object. This prevents the mouse from persisting state between runs.
-        self.initial_mouse = mouse
+        # Keep the mouse factory.
+        self.mouse_class = mouse_class
+        self.mouse_args = (maze.dim, init_state, verbose) if mouse_args is None else tuple(mouse_args)
+        self.mouse = None
+        self.mouse_snapshot = None
 
         self.maze = maze
         self.init_state = init_state
         self.max_steps = max_steps
         self.steps = np.zeros(2)
         self.delay = delay
+        self.fps = fps
         self.pause = pause
         self.verbose = verbose
+        self.track_regret = track_regret
+        self.trace = None
+        self.latency = None
+
+        # The run's numpy Generator, if seeded. It replaces the mouse's 'rng',
+        # which mice set to np.random and draw all their random choices from.
+        self.rng = None
+        self.log = log.get_logger('controller')
 
     def run_with_display(self, display):
         """Runs the maze game in display mode.
@@ -58,8 +80,12 @@ class Controller:
         # Set up space bar pause.
         self.display.on_space(self.toggle_pause)
 
-        # Start the planning phase.
-        self.display.screen.ontimer(self.run_display_step, self.delay)
+        # Start the planning phase, redrawing only once per frame if we have a frame rate.
+        if self.fps:
+            self.display.animate(False)
+            self.display.sleep(self.run_display_frame, 0)
+        else:
+            self.display.sleep(self.run_display_step, self.delay)
 
         # Sets the screen to focus, to allow for key events.
         self.display.screen.listen()
@@ -77,8 +103,20 @@ class Controller:
     def planning_mode(self):
         """Sets up the controller state in preparation for a planning run.
         """
-        # Create a new copy of mouse.
-        self.mouse = copy.deepcopy(self.initial_mouse)
+        # Create a new mouse, or restore the one we have to its new state.
+        # There's no mouse if the moves come from outside the controller.
+        if self.mouse_class is None:
+            self.mouse = None
+        elif self.mouse_snapshot is not None:
+            self.mouse.restore(self.mouse_snapshot)
+        else:
+            self.mouse = self.mouse_class(*self.mouse_args)
+            if hasattr(self.mouse, 'snapshot') and hasattr(self.mouse, 'restore'):
+                self.mouse_snapshot = self.mouse.snapshot()
+
+        # Give the mouse the run's random stream, if there is one.
+        if self.mouse is not None and self.rng is not None:
+            self.mouse.rng = self.rng
 
         # Pause if requested.
         self.paused = True if self.pause else False
@@ -96,6 +134,9 @@ class Controller:
         self.reached_goal = False
         self.planning_complete = False
 
+        # Clear the regret trace.
+        self.regrets = { Phase.PLAN: [], Phase.EXECUTE: [] }
+
     def run_display_step(self):
         """Handles the running of a step when in display mode.
 
@@ -103,10 +144,47 @@ class Controller:
         """
         # Skip step if paused.
         if self.paused:
-            if self.verbose: print('paused')
+            self.log.debug('Paused.')
             self.display.sleep(self.run_display_step, self.delay)
             return
 
+        # Run the step, and enqueue another if not finished.
+        if self.play_display_step():
+            self.display.sleep(self.run_display_step, self.delay)
+
+    def run_display_frame(self):
+        """Plays steps for one frame in display mode, then redraws the display once.
+
+        Steps are played until the frame's time is up, so the simulation runs
+        at full speed whatever the frame rate.
+        """
+        frame = 1000 / self.fps
+
+        # Skip frame if paused.
+        if self.paused:
+            self.log.debug('Paused.')
+            self.display.sleep(self.run_display_frame, int(frame))
+            return
+
+        # Play steps until the frame is over.
+        start = time.perf_counter()
+        while (time.perf_counter() - start) * 1000 < frame:
+            if not self.play_display_step():
+                return
+            if self.paused:
+                break
+
+        # Draw every move since the last frame at once.
+        self.display.redraw()
+        elapsed = (time.perf_counter() - start) * 1000
+        self.display.sleep(self.run_display_frame, int(max(0, frame - elapsed)))
+
+    def play_display_step(self):
+        """Plays a step and draws it.
+
+        Returns:
+            True if the game goes on, False if the display was closed.
+        """
         # Keep old mouse pos to see if we moved at all.
         old_pos = self.mouse_state.pos.copy()
 
@@ -116,7 +194,7 @@ class Controller:
         # If we've taken too long, exit.
         if self.steps[self.phase.value] >= (self.max_steps - 1):
             self.display.close()
-            return
+            return False
 
         # Update the display.
         self.display.set_heading(self.mouse_state.heading)
@@ -125,9 +203,7 @@ class Controller:
        
         # Check if finished.
         if not finished:
-            # Enqueue another step if not finished.
-            self.display.sleep(self.run_display_step, self.delay)
-            return 
+            return True
         elif self.phase == Phase.PLAN and self.planning_complete:
             # If finished planning run, start the execution run.
             self.execution_mode()
@@ -135,13 +211,11 @@ class Controller:
             # Reset display.
             self.display.clear_track()
             self.display.place_mouse(self.mouse_state.pos, self.mouse_state.heading)
-            
-            # Start the next run.
-            self.display.sleep(self.run_display_step, self.delay)
-            return
+            return True
 
         # Mouse has finished, exit Turtle main loop.
         self.display.close()
+        return False
 
     def execution_mode(self):
         """Sets up the controller state in preparation for an execution run.
@@ -201,35 +275,74 @@ class Controller:
         Returns:
             True if mouse finished run, else False.
         """
+        readings = self.begin_step()
+
+        # Get mouse's desired move.
+        rot, move = self.timed('next_move', self.mouse.next_move, readings)
+
+        return self.end_step(readings, rot, move)
+
+    def begin_step(self):
+        """Starts a step, for moves that come from outside the controller.
+
+        Returns:
+            the sensor readings to give the mouse.
+        """
         self.steps[self.phase.value] += 1
+        log.set_step(int(self.steps[self.phase.value]))
 
         # Get sensor readings.
-        readings = self.maze.sensor_readings(self.mouse_state.pos, self.mouse_state.heading)
+        readings = self.timed('sensor_readings', self.maze.sensor_readings, self.mouse_state.pos, self.mouse_state.heading)
+        self.log.debug("Phase: %s, step: %d, pos: %s, heading: %s, sensors: %s", self.phase.value,
+            self.steps[self.phase.value], self.mouse_state.pos, self.mouse_state.heading.value, readings)
 
-        if self.verbose:
-            print('-----')
-            print(f"Phase: {self.phase.value}")
-            print(f"Step: {self.steps[self.phase.value]:.0f}")
-            print(f"Pos: {self.mouse_state.pos}")
-            print(f"Heading: {self.mouse_state.heading.value}")
-            print(f"Sensors: {readings}")
+        return readings
 
-        # Get mouse's desired move.
-        rot, move = self.mouse.next_move(readings)
-        
+    def end_step(self, readings, rot, move):
+        """Finishes a step with the mouse's move.
+
+        Arguments:
+            readings -- the sensor readings the mouse was given.
+            rot -- a Rotation, e.g. Rotation.LEFT, or 'RESET'.
+            move -- the move in steps, or 'RESET'.
+        Returns:
+            True if mouse finished run, else False.
+        """
         # Check if mouse has finished planning.
         if self.phase == Phase.PLAN and (rot, move) == ('RESET', 'RESET'):
             if self.reached_goal:
                 self.planning_complete = True
-                if self.verbose: print("Finished planning.")
-                return True
+                self.log.info("Finished planning.")
             else:
-                if self.verbose: print("Mouse hasn't reached goal, can't reset.")
-                return False
+                self.log.info("Mouse hasn't reached goal, can't reset.")
+            self.record_trace(readings, rot, move, self.reached_goal)
+            return self.reached_goal
+
+        # Remember the state before moving, to measure the move's regret.
+        if self.track_regret:
+            old_pos, old_heading = self.mouse_state.pos.copy(), self.mouse_state.heading
+
+        # Make the move.
+        finished = self.make_move(rot, move)
+        self.record_trace(readings, rot, move, self.move_valid)
 
-        if self.verbose:
-            print(f"Rot: {rot.value}")
-            print(f"Move: {move}")
+        # Record how much closer the move took us.
+        if self.track_regret:
+            self.record_regret(old_pos, old_heading, rot, move)
+
+        return finished
+
+    def make_move(self, rot, move):
+        """Validates the mouse's move and updates its state.
+
+        Arguments:
+            rot -- a Rotation, e.g. Rotation.LEFT.
+            move -- the move in steps.
+        Returns:
+            True if mouse finished run, else False.
+        """
+        self.log.debug("Rot: %s, move: %s", rot, move)
+        self.move_valid = False
 
         # Validate the mouse's response.
         if not self.valid_rotation(rot) or not self.valid_move(move):
@@ -237,28 +350,98 @@ class Controller:
 
         # Is the move valid given the structure of the maze?
         new_heading = self.mouse_state.heading.rotate(rot)
-        if not self.maze.valid_move(self.mouse_state.pos, new_heading, move):
-            if self.verbose:
-                print(f"Moving {move} squares in heading {new_heading.value} from {self.mouse_state.pos} is invalid.")
+        if not self.timed('valid_move', self.maze.valid_move, self.mouse_state.pos, new_heading, move):
+            self.log.info("Moving %s squares in heading %s from %s is invalid.", move, new_heading.value, self.mouse_state.pos)
             return False
 
         # Update the mouse's state.
         self.mouse_state.update(rot, move)
+        self.move_valid = True
 
         # Check if mouse has reached goal.
         if (not self.reached_goal) and self.maze.reached_goal(self.mouse_state.pos):
-            if self.verbose: print(f"Reached goal {self.mouse_state.pos}.")
+            self.log.info("Reached goal %s.", self.mouse_state.pos)
             self.reached_goal = True
 
             # Check if mouse has completed the final run.
             if self.phase == Phase.EXECUTE:
-                if self.verbose: print(f"Finished.")
+                self.log.info("Finished.")
                 self.execution_complete = True
                 return True
 
         # Mouse hasn't finished, keep going.
         return False
 
+    def timed(self, operation, func, *args):
+        """Calls a function, recording how long it took if we're profiling latency.
+
+        Arguments:
+            operation -- the operation's name, one of LatencyProfiler.OPERATIONS.
+            func -- the function to call.
+            args -- the function's arguments.
+        Returns:
+            the function's result.
+        """
+        if self.latency is None:
+            return func(*args)
+
+        start = time.perf_counter_ns()
+        result = func(*args)
+        self.latency.record(self.mouse_class.__name__, operation, self.phase, time.perf_counter_ns() - start)
+
+        return result
+
+    def record_trace(self, readings, rot, move, valid):
+        """Records the step in the replay trace, if there is one.
+
+        Arguments:
+            readings -- the sensor readings the mouse was given.
+            rot -- the mouse's rotation.
+            move -- the mouse's move.
+            valid -- True if the step was accepted.
+        """
+        if self.trace is None:
+            return
+
+        self.trace.record(self.phase, int(self.steps[self.phase.value]), self.mouse_state.pos, self.mouse_state.heading, readings, rot, move, valid)
+
+    def record_regret(self, old_pos, old_heading, rot, move):
+        """Records how many steps a move wasted.
+
+        An optimal move takes the mouse one step closer to the goal. Any less
+        progress, including invalid moves, is regret. Moves from or to a
+        square the goal can't be reached from make no progress, so they're a
+        regret of 1.
+
+        Arguments:
+            old_pos -- the [x, y] position before the move.
+            old_heading -- the Heading before the move.
+            rot -- the Rotation made.
+            move -- the move made.
+        """
+        before = self.maze.goal_distance(old_pos, old_heading)
+        after = self.maze.goal_distance(self.mouse_state.pos, self.mouse_state.heading)
+        regret = 1 if before == -1 or after == -1 else 1 - (before - after)
+
+        self.regrets[self.phase].append({
+            'step': int(self.steps[self.phase.value]),
+            'pos': old_pos,
+            'heading': old_heading,
+            'rot': rot,
+            'move': move,
+            'regret': regret
+        })
+
+    def total_regret(self, phase):
+        """Sums the regret of all moves in a phase.
+
+        Arguments:
+            phase -- the Phase, e.g. Phase.EXECUTE.
+        Returns:
+            the total steps wasted.
+        """
+        return sum(r['regret'] for r in self.regrets[phase])
+
     def toggle_pause(self):
         """Toggles the paused state.
         """
@@ -304,8 +487,8 @@ class Controller:
             True if valid, False otherwise.
         """
         # Is this a valid rotation?
-        if not rot in Rotation:
-            if self.verbose: print(f"Invalid rot {rot}, must be a Rotation.") 
+        if not isinstance(rot, Rotation):
+            self.log.info("Invalid rot %s, must be a Rotation.", rot)
             return False 
 
         return True
@@ -320,12 +503,12 @@ class Controller:
         """
         # Is it an integer?
         if not move % 1 == 0:
-            print(f"Move should be integer, got: {move}")
+            self.log.info("Move should be integer, got: %s", move)
             return False
 
         # Check it's in the correct range.
         if not move in range(-self.MAX_STEPS, self.MAX_STEPS + 1):
-            print(f"Move should be in range ({-self.MAX_STEPS},{self.MAX_STEPS}), got {move}.")
+            self.log.info("Move should be in range (%d,%d), got %s.", -self.MAX_STEPS, self.MAX_STEPS, move)
             return False
             
         return True
@@ -1,6 +1,6 @@
 import turtle
 import numpy as np
-import pdb
+import log
 from heading import Heading
 
 class Display:
@@ -14,7 +14,11 @@ class Display:
         self.maze = maze
         self.square_size = square_size
         self.origin = maze.dim * square_size / -2
-        self.paths = np.zeros((maze.dim ** 2, maze.dim ** 2), dtype=np.int8)
+
+        # Counts the times each passage is taken, indexed by [x, y, 0] for the
+        # passage east of a square and [x, y, 1] for the passage north of it,
+        # as in Trace.add_move.
+        self.paths = np.zeros((maze.dim, maze.dim, 2), dtype=np.uint32)
         
         # For some reason turtle crashes when we reboot the screen..
         try:
@@ -138,7 +142,7 @@ class Display:
             heading -- a Heading value, e.g. Heading.NORTH.
         """
         # Keep track of pos for path drawing.
-        self.pos = np.array(pos, dtype=np.int8)
+        self.pos = np.array(pos, dtype=np.int64)
 
         # Set the mouse location.
         x = self.origin + (pos[0] + 0.5) * self.square_size
@@ -162,17 +166,24 @@ class Display:
         self.mouse_tool.setheading(heading.value)
 
     def increment_path(self, from_pos, to_pos):
-        # Convert the positions to indexes.
-        from_idx, to_idx = self.square_index(from_pos), self.square_index(to_pos)
+        # Find the passage between the squares. It's the same in both directions.
+        idx = self.passage_index(from_pos, to_pos)
+        self.paths[idx] += 1
 
-        # Increment the path in both directions.
-        self.paths[from_idx, to_idx] += 1
-        self.paths[to_idx, from_idx] += 1
+        return self.paths[idx]
 
-        return self.paths[from_idx, to_idx]
+    def passage_index(self, from_pos, to_pos):
+        """Finds the passage between two neighbouring squares.
 
-    def square_index(self, pos):
-        return pos[0] + self.maze.dim * pos[1]
+        Arguments:
+            from_pos -- the position of one square.
+            to_pos -- the position of the other.
+        Returns:
+            the (x, y, side) index into 'paths'.
+        """
+        x, y = min(from_pos[0], to_pos[0]), min(from_pos[1], to_pos[1])
+
+        return (x, y, 0 if from_pos[0] != to_pos[0] else 1)
 
     def move(self, pos):
         """Draws a mouse's move.
@@ -184,12 +195,12 @@ class Display:
         old_pos = self.pos.copy()
         x = self.origin + (pos[0] + 0.5) * self.square_size
         y = self.origin + (pos[1] + 0.5) * self.square_size
-        self.pos = np.array(pos, dtype=np.int8)
+        self.pos = np.array(pos, dtype=np.int64)
         
         # Calculate the heading, and number of steps.
         diff = self.pos - old_pos
         n_squares = np.linalg.norm(diff)
-        heading = np.array(diff / n_squares, dtype=np.int8)
+        heading = np.array(diff / n_squares, dtype=np.int64)
 
         # For each square, draw the colour corresponding to how many times we've
         # taken that path.
@@ -201,28 +212,72 @@ class Display:
             # Increment the path counter.
             n = self.increment_path(start_pos, end_pos)
 
-            # Set path colour.
-            colour = 'red'
-            if n == 2:
-                colour = 'orange'
-            elif n == 3:
-                colour = 'yellow'
-            elif n == 4:
-                colour = 'green'
-            elif n == 5:
-                colour = 'blue'
-            elif n > 5:
-                colour = 'violet'
-            
             # Draw path.
-            self.mouse_tool.color(colour)
+            self.mouse_tool.color(self.path_colour(n))
             self.mouse_tool.goto(x, y)
 
+    def path_colour(self, n):
+        """Gets the colour of a path.
+
+        Arguments:
+            n -- the number of times the path has been taken.
+        Returns:
+            the colour name.
+        """
+        colour = 'red'
+        if n == 2:
+            colour = 'orange'
+        elif n == 3:
+            colour = 'yellow'
+        elif n == 4:
+            colour = 'green'
+        elif n == 5:
+            colour = 'blue'
+        elif n > 5:
+            colour = 'violet'
+
+        return colour
+
+    def draw_track(self, counts):
+        """Draws a track that's already been taken, e.g. when seeking in a replay.
+
+        Arguments:
+            counts -- a (dim, dim, 2) array of the number of times each passage
+                has been taken, as in Trace.add_move.
+        """
+        # Turn animation off to draw the track instantaneously.
+        self.screen.tracer(0)
+        self.mouse_tool.penup()
+        self.paths[:] = counts
+        for x, y, side in np.argwhere(counts > 0):
+            # Draw the passage.
+            from_pos = np.array([x, y])
+            to_pos = from_pos + (Heading.EAST if side == 0 else Heading.NORTH).components()
+            self.mouse_tool.goto(self.origin + (from_pos[0] + 0.5) * self.square_size, self.origin + (from_pos[1] + 0.5) * self.square_size)
+            self.mouse_tool.pendown()
+            self.mouse_tool.color(self.path_colour(counts[x, y, side]))
+            self.mouse_tool.goto(self.origin + (to_pos[0] + 0.5) * self.square_size, self.origin + (to_pos[1] + 0.5) * self.square_size)
+            self.mouse_tool.penup()
+        self.screen.tracer(1)
+
     def clear_track(self):
         """Clears the mouse's tracks from the display.
         """
         self.mouse_tool.clear()
-        self.paths = np.zeros((self.maze.dim ** 2, self.maze.dim ** 2), dtype=np.int8)
+        self.paths[:] = 0
+
+    def animate(self, on):
+        """Turns animation on or off. While it's off, nothing is shown until 'redraw' is called.
+
+        Arguments:
+            on -- True to animate every move, False to only draw on 'redraw'.
+        """
+        self.screen.tracer(1 if on else 0)
+
+    def redraw(self):
+        """Shows everything drawn since the last redraw, when animation is off.
+        """
+        self.screen.update()
 
     def mainloop(self):
         """Begins the Turtle mainloop.
@@ -234,7 +289,7 @@ class Display:
     def close(self):
         """Closes the display.
         """
-        print('closing screen')
+        log.get_logger('display').info('Closing screen.')
         turtle.bye()
 
     def on_space(self, callback):
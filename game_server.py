@@ -0,0 +1,207 @@
+import os
+import json
+import asyncio
+import log
+from maze import Maze
+from controller import Controller
+from heading import Heading
+from rotation import Rotation
+from phase import Phase
+
+class GameServer:
+    # Every game starts in the same corner, as in robomouse.
+    INIT_STATE = { 'pos': [0, 0], 'heading': Heading.NORTH }
+
+    # Bytes read from a connection at a time.
+    READ_SIZE = 65536
+
+    def __init__(self, maze_files, max_steps=1000):
+        """Hosts maze games for agents connecting over a socket.
+
+        Each maze is loaded once and shared, read-only, by every game played
+        on it. Agents send newline-delimited JSON messages, and may play any
+        number of games on one connection at once. Every message waiting on a
+        connection is handled before the replies are sent back together.
+
+        Messages from the agent:
+            { "game": id, "new": maze_file } -- starts a game on a served maze.
+                The maze may be left out if only one maze is served, and the
+                ID mustn't belong to a game that's still running.
+            { "game": id, "rot": degrees, "move": squares } -- makes a move.
+            { "game": id, "reset": true } -- finishes planning.
+        Messages to the agent:
+            { "game": id, "phase": p, "step": n, "readings": [l, f, r] } --
+                asks for the next move.
+            { "game": id, "done": true, "score": s, "steps": [plan, execute] } --
+                the game is over, the score is null if it wasn't completed.
+                Steps are the number of moves made in each phase, 0 for the
+                execution phase if it never started.
+            { "game": id, "error": message } -- the message was rejected.
+
+        Arguments:
+            maze_files -- the paths to the maze files to serve.
+            max_steps -- the maximum number of steps per phase.
+        """
+        self.mazes = { os.path.normpath(f): Maze(f) for f in maze_files }
+        self.max_steps = max_steps
+        self.log = log.get_logger('server')
+
+    async def serve(self, socket_path=None, port=None):
+        """Accepts connections until cancelled.
+
+        Arguments:
+            socket_path -- the path of a Unix socket to listen on.
+            port -- a local TCP port to listen on, if there's no socket path.
+        """
+        if socket_path:
+            server = await asyncio.start_unix_server(self.handle_connection, path=socket_path)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host='127.0.0.1', port=port)
+
+        async with server:
+            await server.serve_forever()
+
+    async def handle_connection(self, reader, writer):
+        """Plays an agent's games until it disconnects.
+
+        Arguments:
+            reader -- the connection's asyncio.StreamReader.
+            writer -- the connection's asyncio.StreamWriter.
+        """
+        games = dict()
+        buffer = b''
+        try:
+            while True:
+                data = await reader.read(self.READ_SIZE)
+                if not data:
+                    break
+
+                # Handle every complete message, and send the replies at once.
+                lines = (buffer + data).split(b'\n')
+                buffer = lines.pop()
+                replies = [self.handle_message(games, line) for line in lines if line.strip()]
+                writer.write(b''.join(json.dumps(r).encode() + b'\n' for r in replies))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def handle_message(self, games, line):
+        """Handles a message from an agent.
+
+        Arguments:
+            games -- the connection's games, a dict of game ID to a list of its
+                Controller and the readings the agent was last given.
+            line -- the message.
+        Returns:
+            the reply dict.
+        """
+        try:
+            message = json.loads(line)
+            game = message['game']
+        except (ValueError, KeyError, TypeError):
+            return { 'game': None, 'error': 'Messages must be JSON objects with a game ID.' }
+
+        try:
+            if 'new' in message:
+                return self.new_game(games, game, message['new'])
+
+            if game not in games:
+                return { 'game': game, 'error': f"Game {game} doesn't exist." }
+            if message.get('reset'):
+                rot, move = 'RESET', 'RESET'
+            else:
+                rot = Rotation(message['rot']) if message.get('rot') in (-90, 0, 90) else message.get('rot')
+                move = message.get('move')
+                if not isinstance(move, (int, float)):
+                    return { 'game': game, 'error': f"Move should be a number, got: {move}" }
+
+            return self.play_step(games, game, rot, move)
+        except Exception as e:
+            return { 'game': game, 'error': str(e) }
+
+    def new_game(self, games, game, maze_file):
+        """Starts a game.
+
+        Arguments:
+            games -- the connection's games.
+            game -- the new game's ID.
+            maze_file -- the path of a served maze, or None if only one is served.
+        Returns:
+            the reply dict, asking for the first move.
+        """
+        if game in games:
+            return { 'game': game, 'error': f"Game {game} is already running." }
+        if maze_file is None and len(self.mazes) == 1:
+            maze = next(iter(self.mazes.values()))
+        elif maze_file is not None and os.path.normpath(maze_file) in self.mazes:
+            maze = self.mazes[os.path.normpath(maze_file)]
+        else:
+            return { 'game': game, 'error': f"Maze {maze_file} isn't served." }
+
+        controller = Controller(None, maze, self.INIT_STATE, max_steps=self.max_steps, delay=0, verbose=False)
+        controller.planning_mode()
+        games[game] = [controller, None]
+        self.log.info("Game %s started on maze %s.", game, maze_file)
+
+        return self.ask_move(games, game)
+
+    def play_step(self, games, game, rot, move):
+        """Plays an agent's move, following the same rules as Controller.run_normal.
+
+        Arguments:
+            games -- the connection's games.
+            game -- the game ID.
+            rot -- the Rotation, or 'RESET'.
+            move -- the move in steps, or 'RESET'.
+        Returns:
+            the reply dict, asking for the next move or saying the game is over.
+        """
+        controller, readings = games[game]
+        finished = controller.end_step(readings, rot, move)
+        if finished:
+            # If finished planning, start execution run.
+            if controller.phase == Phase.PLAN and controller.planning_complete:
+                controller.execution_mode()
+            elif controller.phase == Phase.EXECUTE and controller.reached_goal:
+                return self.end_game(games, game)
+
+        # Games that have taken too long are over.
+        if controller.steps[controller.phase.value] >= controller.max_steps - 1:
+            return self.end_game(games, game)
+
+        return self.ask_move(games, game)
+
+    def ask_move(self, games, game):
+        """Starts a step, asking the agent for its move.
+        """
+        controller = games[game][0]
+        readings = controller.begin_step()
+        games[game][1] = readings
+
+        return {
+            'game': game,
+            'phase': controller.phase.value,
+            'step': int(controller.steps[controller.phase.value]),
+            'readings': [int(r) for r in readings]
+        }
+
+    def end_game(self, games, game):
+        """Ends a game, reporting its score.
+        """
+        controller = games.pop(game)[0]
+        score = controller.score()
+        self.log.info("Game %s finished with score %s.", game, score)
+
+        # Step counters start from -1, and the execution counter is only
+        # reset once execution starts.
+        plan_steps = int(controller.steps[Phase.PLAN.value]) + 1
+        execute_steps = int(controller.steps[Phase.EXECUTE.value]) + 1 if controller.phase == Phase.EXECUTE else 0
+
+        return {
+            'game': game,
+            'done': True,
+            'score': None if score is None else float(score),
+            'steps': [plan_steps, execute_steps]
+        }
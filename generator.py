@@ -0,0 +1,270 @@
+import numpy as np
+from heading import Heading
+from maze import Maze
+
+class MazeGenerator:
+    ALGORITHMS = ('backtracker', 'kruskal', 'prim')
+
+    def __init__(self, seed=None):
+        """Creates a seeded maze generator.
+
+        The same seed always produces the same sequence of mazes. Small mazes
+        are quick to make, tens of thousands a minute at 16x16, but large ones
+        fall well short of that: a 256x256 maze takes around 0.1 s with
+        'kruskal', the fastest, so a few hundred can be made a minute.
+
+        Arguments:
+            seed -- the seed for the random number generator.
+        """
+        self.rng = np.random.default_rng(seed)
+
+    def generate(self, dim, algorithm='kruskal', loops=0):
+        """Generates a new maze in memory.
+
+        Passages are carved as a spanning tree over the squares, so every
+        square, including the goal, can be reached from the start. Loops are
+        then added by removing a random fraction of the remaining walls.
+
+        Arguments:
+            dim -- the dimension of the maze, must be even.
+            algorithm -- the carving algorithm, one of ALGORITHMS.
+            loops -- the fraction of remaining interior walls to remove.
+        Returns:
+            the new Maze.
+        """
+        return Maze(walls=self.walls(dim, algorithm, loops))
+
+    def generate_many(self, n, dim, algorithm='kruskal', loops=0):
+        """Generates a sequence of mazes.
+
+        Arguments:
+            n -- the number of mazes.
+            dim -- the dimension of each maze, must be even.
+            algorithm -- the carving algorithm, one of ALGORITHMS.
+            loops -- the fraction of remaining interior walls to remove.
+        Returns:
+            a generator of Mazes.
+        """
+        for _ in range(n):
+            yield self.generate(dim, algorithm, loops)
+
+    def walls(self, dim, algorithm='kruskal', loops=0):
+        """Generates the walls for a new maze.
+
+        Arguments:
+            dim -- the dimension of the maze, must be even.
+            algorithm -- the carving algorithm, one of ALGORITHMS.
+            loops -- the fraction of remaining interior walls to remove.
+        Returns:
+            a (dim, dim) uint8 numpy array of walls, encoded as in Maze.
+        """
+        if dim % 2 or dim < 2:
+            raise Exception(f"Maze dimension must be even and positive, got {dim}.")
+        if algorithm not in self.ALGORITHMS:
+            raise Exception(f"Unknown algorithm '{algorithm}', must be one of {self.ALGORITHMS}.")
+        if not 0 <= loops <= 1:
+            raise Exception(f"Loops must be in range [0, 1], got {loops}.")
+
+        # Carve a spanning tree of passages.
+        east, north = getattr(self, algorithm)(dim)
+
+        # Knock through some of the remaining walls.
+        if loops > 0:
+            east |= self.rng.random(east.shape) < loops
+            north |= self.rng.random(north.shape) < loops
+
+        return self.__walls(east, north)
+
+    def backtracker(self, dim):
+        """Carves passages with the recursive backtracker, i.e. a randomised depth-first search.
+
+        Produces long, winding corridors with few junctions. Each step of
+        the walk depends on the last, so it can't be done with whole-array
+        operations like 'kruskal', and it's about twice as slow on large mazes.
+
+        Arguments:
+            dim -- the dimension of the maze.
+        Returns:
+            boolean arrays of the open east (dim - 1, dim) and north (dim, dim - 1) passages.
+        """
+        n = dim * dim
+        east, north = np.zeros(n, dtype=bool), np.zeros(n, dtype=bool)
+
+        # Draw the order each square will try its neighbours in up front, it's
+        # much cheaper than drawing a number per step.
+        orders = np.argsort(self.rng.random((n, 4)), axis=1).tolist()
+
+        # Squares are numbered x * dim + y. Walk the maze with an explicit
+        # stack, holding each square and how many neighbours it has tried.
+        visited = bytearray(n)
+        visited[0] = 1
+        stack = [0]
+        tried = [0] * n
+        while stack:
+            square = stack[-1]
+            if tried[square] == 4:
+                stack.pop()
+                continue
+            direction = orders[square][tried[square]]
+            tried[square] += 1
+
+            # Find the neighbour, and the passage between us.
+            x, y = divmod(square, dim)
+            if direction == 0 and y < dim - 1:
+                neighbour, passage, passages = square + 1, x * (dim - 1) + y, north
+            elif direction == 1 and x < dim - 1:
+                neighbour, passage, passages = square + dim, square, east
+            elif direction == 2 and y > 0:
+                neighbour, passage, passages = square - 1, x * (dim - 1) + y - 1, north
+            elif direction == 3 and x > 0:
+                neighbour, passage, passages = square - dim, square - dim, east
+            else:
+                continue
+
+            # Carve through to the neighbour if it's new.
+            if not visited[neighbour]:
+                visited[neighbour] = 1
+                passages[passage] = True
+                stack.append(neighbour)
+
+        return east[:(dim - 1) * dim].reshape(dim - 1, dim), north[:dim * (dim - 1)].reshape(dim, dim - 1)
+
+    def kruskal(self, dim):
+        """Carves passages with randomised Kruskal's algorithm.
+
+        Kruskal's algorithm over randomly ordered walls produces the minimum
+        spanning tree of randomly weighted passages. That tree is unique, so
+        it's found here with Borůvka's algorithm instead, which merges every
+        region at once and runs as whole-array operations. Produces many short
+        dead ends.
+
+        Arguments:
+            dim -- the dimension of the maze.
+        Returns:
+            boolean arrays of the open east (dim - 1, dim) and north (dim, dim - 1) passages.
+        """
+        # Number squares x * dim + y, and list every interior wall as the
+        # pair of squares either side. East walls come first, then north.
+        squares = np.arange(dim * dim).reshape(dim, dim)
+        u = np.concatenate((squares[:-1, :].ravel(), squares[:, :-1].ravel()))
+        v = np.concatenate((squares[1:, :].ravel(), squares[:, 1:].ravel()))
+        carved = np.zeros(len(u), dtype=bool)
+
+        # Random weights; shuffling the walls lets the index be the weight.
+        order = self.rng.permutation(len(u))
+        u, v = u[order], v[order]
+        ids = order
+
+        # Each square starts as its own region.
+        regions = np.arange(dim * dim)
+        while len(u) > 0:
+            # Drop walls inside a region, they'd make loops.
+            ru, rv = regions[u], regions[v]
+            between = ru != rv
+            u, v, ids, ru, rv = u[between], v[between], ids[between], ru[between], rv[between]
+            if len(u) == 0:
+                break
+
+            # Each region knocks through its lightest wall. Walls are in weight
+            # order, so that's the lowest ranked wall against the region.
+            ranks = np.arange(len(u))
+            lightest = np.full(dim * dim, len(u))
+            np.minimum.at(lightest, ru, ranks)
+            np.minimum.at(lightest, rv, ranks)
+            region_ids = np.flatnonzero(lightest < len(u))
+            lightest = lightest[region_ids]
+            carved[ids[lightest]] = True
+
+            # Point each region at the region through its wall. Regions that
+            # chose the same wall point at each other, let the lower one lead.
+            parents = np.arange(dim * dim)
+            parents[region_ids] = np.where(ru[lightest] == region_ids, rv[lightest], ru[lightest])
+            mutual = (parents[parents] == np.arange(dim * dim)) & (np.arange(dim * dim) < parents)
+            parents[mutual] = np.arange(dim * dim)[mutual]
+
+            # Follow the pointers until each region finds its leader.
+            while True:
+                grandparents = parents[parents]
+                if np.array_equal(grandparents, parents):
+                    break
+                parents = grandparents
+            regions = parents[regions]
+
+        n_east = (dim - 1) * dim
+        return carved[:n_east].reshape(dim - 1, dim), carved[n_east:].reshape(dim, dim - 1)
+
+    def prim(self, dim):
+        """Carves passages with randomised Prim's algorithm.
+
+        Grows the maze from the start square, each step connecting a random
+        square on the frontier to the maze. Produces short, branching passages.
+        The frontier changes with every step, so like 'backtracker' it runs
+        one square at a time, and is slower than 'kruskal' on large mazes.
+
+        Arguments:
+            dim -- the dimension of the maze.
+        Returns:
+            boolean arrays of the open east (dim - 1, dim) and north (dim, dim - 1) passages.
+        """
+        n = dim * dim
+        east, north = np.zeros(n, dtype=bool), np.zeros(n, dtype=bool)
+
+        # Draw all of the random choices up front.
+        picks = self.rng.random(n).tolist()
+        links = self.rng.random(n).tolist()
+
+        # Squares are numbered x * dim + y.
+        in_maze = bytearray(n)
+        on_frontier = bytearray(n)
+        frontier = [0]
+        on_frontier[0] = 1
+        for step in range(n):
+            # Take a random square off the frontier, swapping the last square
+            # into its place.
+            idx = int(picks[step] * len(frontier))
+            square = frontier[idx]
+            frontier[idx] = frontier[-1]
+            frontier.pop()
+            in_maze[square] = 1
+
+            # Sort the neighbours into those in the maze and those to add to
+            # the frontier.
+            x, y = divmod(square, dim)
+            neighbours = []
+            if y < dim - 1: neighbours.append((square + 1, north, x * (dim - 1) + y))
+            if x < dim - 1: neighbours.append((square + dim, east, square))
+            if y > 0: neighbours.append((square - 1, north, x * (dim - 1) + y - 1))
+            if x > 0: neighbours.append((square - dim, east, square - dim))
+            connected = []
+            for neighbour, passages, passage in neighbours:
+                if in_maze[neighbour]:
+                    connected.append((passages, passage))
+                elif not on_frontier[neighbour]:
+                    on_frontier[neighbour] = 1
+                    frontier.append(neighbour)
+
+            # Join the square to a random neighbour already in the maze.
+            if connected:
+                passages, passage = connected[int(links[step] * len(connected))]
+                passages[passage] = True
+
+        return east[:(dim - 1) * dim].reshape(dim - 1, dim), north[:dim * (dim - 1)].reshape(dim, dim - 1)
+
+    def __walls(self, east, north):
+        """Encodes open passages as maze walls.
+
+        Arguments:
+            east -- boolean array of open passages between [x, y] and [x + 1, y].
+            north -- boolean array of open passages between [x, y] and [x, y + 1].
+        Returns:
+            a uint8 numpy array of walls. Both sides of each passage are set, so
+            the walls are always consistent.
+        """
+        dim = north.shape[0]
+        walls = np.zeros((dim, dim), dtype=np.uint8)
+        walls[:-1, :] |= east * np.uint8(Maze.HEADING_DECIMAL_MAP[Heading.EAST])
+        walls[1:, :] |= east * np.uint8(Maze.HEADING_DECIMAL_MAP[Heading.WEST])
+        walls[:, :-1] |= north * np.uint8(Maze.HEADING_DECIMAL_MAP[Heading.NORTH])
+        walls[:, 1:] |= north * np.uint8(Maze.HEADING_DECIMAL_MAP[Heading.SOUTH])
+
+        return walls
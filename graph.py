@@ -8,6 +8,14 @@ class Graph:
         # Initialise the nodes dictionary.
         self.nodes = dict()
 
+    def copy(self):
+        """Copies the graph. Edges are copied too, as their traversals change.
+        """
+        graph = Graph()
+        graph.nodes = { node: np.array([dict(e) for e in edges]) for node, edges in self.nodes.items() }
+
+        return graph
+
     def add_node(self, node):
         """Adds a new node.
 
@@ -73,10 +81,10 @@ class Graph:
                 the loss between a start and destination node.
         """
         # Create a priority queue to process nodes.
-        queue = np.array([], dtype=np.int8)
+        queue = np.array([], dtype=np.int64)
 
         # Track evaluated nodes.
-        evaluated = np.array([], dtype=np.int8)
+        evaluated = np.array([], dtype=np.int64)
 
         # Store g-scores for each node. We need this to calculate g-score for
         # new nodes.
@@ -160,7 +168,7 @@ class Graph:
 
     def __ancestral_path(self, node, ancestors):
         # Keep track of ancestors.
-        path = np.array([], dtype=np.int8)
+        path = np.array([], dtype=np.int64)
 
         # Set starting condition.
         current_node = node
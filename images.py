@@ -0,0 +1,184 @@
+import zlib
+import struct
+import numpy as np
+
+class PngWriter:
+    SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+    # Width, height, bit depth, colour type (2 = RGB), compression, filter and interlace.
+    IHDR = struct.Struct('>IIBBBBB')
+
+    def write(filename, image):
+        """Writes an image as a PNG.
+
+        Arguments:
+            filename -- the path to the PNG file.
+            image -- a (height, width, 3) uint8 array of RGB pixels.
+        """
+        height, width, _ = image.shape
+
+        # Each row starts with its filter type, 0 for none.
+        rows = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+        rows[:, 1:] = image.reshape(height, width * 3)
+
+        with open(filename, 'wb') as f_out:
+            f_out.write(PngWriter.SIGNATURE)
+            PngWriter.write_chunk(f_out, b'IHDR', PngWriter.IHDR.pack(width, height, 8, 2, 0, 0, 0))
+            PngWriter.write_chunk(f_out, b'IDAT', zlib.compress(rows.tobytes()))
+            PngWriter.write_chunk(f_out, b'IEND', b'')
+
+    def write_chunk(f_out, kind, data):
+        """Writes a chunk with its length and checksum.
+        """
+        f_out.write(struct.pack('>I', len(data)))
+        f_out.write(kind)
+        f_out.write(data)
+        f_out.write(struct.pack('>I', zlib.crc32(kind + data)))
+
+class GifWriter:
+    # Width, height, flags (global colour table of 2 ** (n + 1) colours), background and aspect ratio.
+    SCREEN = struct.Struct('<HHBBB')
+
+    # Graphic control extension: disposal method 1 (leave the frame in place) and the delay in 1/100 s.
+    CONTROL = struct.Struct('<BBBBHBB')
+
+    # Image descriptor: left, top, width and height, with no local colour table.
+    DESCRIPTOR = struct.Struct('<BHHHHB')
+
+    # Loops the animation forever.
+    LOOP = b'\x21\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00'
+
+    # LZW codes are at most 12 bits.
+    MAX_CODES = 4096
+
+    def __init__(self, filename, palette, delay=50):
+        """Writes an animated GIF, frame by frame.
+
+        Each frame only stores the rectangle that changed since the last, as
+        a run usually changes a few squares a step. Frames that don't change
+        anything are merged into the one before.
+
+        Arguments:
+            filename -- the path to the GIF file.
+            palette -- a (n, 3) uint8 array of RGB colours, at most 256.
+            delay -- the time each frame is shown for in ms.
+        """
+        # The colour table must have a power of two entries, at least 4.
+        self.bits = max(2, int(np.ceil(np.log2(len(palette)))))
+        self.palette = np.zeros((2 ** self.bits, 3), dtype=np.uint8)
+        self.palette[:len(palette)] = palette
+        self.delay = delay
+        self.f_out = open(filename, 'wb')
+        self.last = None
+        self.pending = None
+
+    def add_frame(self, frame):
+        """Adds a frame.
+
+        Arguments:
+            frame -- a (height, width) uint8 array of palette indexes. Every
+                frame must be the same size.
+        """
+        if self.last is None:
+            # Write the header with the first frame's size.
+            height, width = frame.shape
+            self.f_out.write(b'GIF89a')
+            self.f_out.write(self.SCREEN.pack(width, height, 0xf0 | (self.bits - 1), 0, 0))
+            self.f_out.write(self.palette.tobytes())
+            self.f_out.write(self.LOOP)
+            top, left, bottom, right = 0, 0, height, width
+        else:
+            # Find the rectangle that changed.
+            changed = frame != self.last
+            rows, cols = np.flatnonzero(changed.any(axis=1)), np.flatnonzero(changed.any(axis=0))
+            if len(rows) == 0:
+                self.pending[1] += self.delay
+                return
+            top, left, bottom, right = rows[0], cols[0], rows[-1] + 1, cols[-1] + 1
+
+        self.write_pending()
+        self.pending = [(int(left), int(top), frame[top:bottom, left:right]), self.delay]
+        self.last = frame.copy()
+
+    def write_pending(self):
+        """Writes the last frame, now its delay is known.
+        """
+        if self.pending is None:
+            return
+        (left, top, pixels), delay = self.pending
+        height, width = pixels.shape
+        self.f_out.write(self.CONTROL.pack(0x21, 0xf9, 4, 1 << 2, round(delay / 10), 0, 0))
+        self.f_out.write(self.DESCRIPTOR.pack(0x2c, left, top, width, height, 0))
+        self.f_out.write(bytes([self.bits]))
+
+        # The compressed pixels are split into blocks of at most 255 bytes.
+        data = GifWriter.compress(pixels.tobytes(), self.bits)
+        for i in range(0, len(data), 255):
+            block = data[i:i + 255]
+            self.f_out.write(bytes([len(block)]))
+            self.f_out.write(block)
+        self.f_out.write(b'\x00')
+        self.pending = None
+
+    def close(self):
+        """Writes the last frame and closes the GIF.
+        """
+        self.write_pending()
+        self.f_out.write(b'\x3b')
+        self.f_out.close()
+
+    def compress(data, min_code_size):
+        """Compresses pixels with GIF's variable-width LZW.
+
+        Arguments:
+            data -- the palette indexes, one per byte.
+            min_code_size -- the bits per palette index.
+        Returns:
+            the compressed bytes.
+        """
+        clear = 1 << min_code_size
+        end = clear + 1
+        out = bytearray()
+        bits = { 'buffer': 0, 'n': 0 }
+
+        def emit(code, code_size):
+            bits['buffer'] |= code << bits['n']
+            bits['n'] += code_size
+            while bits['n'] >= 8:
+                out.append(bits['buffer'] & 0xff)
+                bits['buffer'] >>= 8
+                bits['n'] -= 8
+
+        # Strings are keyed by their prefix's code and last byte.
+        table = dict()
+        code_size = min_code_size + 1
+        next_code = end + 1
+        emit(clear, code_size)
+        prefix = data[0]
+        for byte in data[1:]:
+            key = prefix << 8 | byte
+            code = table.get(key)
+            if code is not None:
+                prefix = code
+                continue
+            emit(prefix, code_size)
+
+            # Add the new string, widening the codes once the next code
+            # doesn't fit, and start again once the table is full.
+            if next_code < GifWriter.MAX_CODES:
+                table[key] = next_code
+                if next_code == 1 << code_size:
+                    code_size += 1
+                next_code += 1
+            else:
+                emit(clear, code_size)
+                table = dict()
+                code_size = min_code_size + 1
+                next_code = end + 1
+            prefix = byte
+        emit(prefix, code_size)
+        emit(end, code_size)
+        if bits['n'] > 0:
+            out.append(bits['buffer'] & 0xff)
+
+        return bytes(out)
@@ -0,0 +1,221 @@
+import os
+import json
+import numpy as np
+from heading import Heading
+from maze import Maze
+from solver import Solver
+
+class MazeIndex:
+    VERSION = 2
+
+    # Number of open sides for each wall value.
+    OPENINGS = np.array([bin(i).count('1') for i in range(16)])
+
+    # Metrics recorded for each maze.
+    METRICS = ('dim', 'dead_ends', 'junctions', 'branching_factor', 'longest_corridor', 'loops', 'optimal')
+
+    def __init__(self, filename):
+        """Opens a maze index, creating it if it doesn't exist.
+
+        The index stores difficulty metrics against each maze's content hash,
+        so a maze is only measured once however many files or runs it appears
+        in. It also remembers the hash of each file it has seen, so files that
+        haven't changed aren't read again. Files are keyed by their path from
+        the index's directory, so the index works from any working directory.
+
+        Arguments:
+            filename -- the path to the index file.
+        """
+        self.filename = filename
+        self.root = os.path.dirname(os.path.abspath(filename))
+        self.mazes = dict()
+        self.files = dict()
+
+        if os.path.exists(filename):
+            with open(filename, 'r') as f_in:
+                index = json.load(f_in)
+
+            # Metrics from older versions may be missing or measured differently.
+            if index.get('version') == self.VERSION:
+                self.mazes = index['mazes']
+                self.files = index['files']
+
+    def save(self):
+        """Writes the index to disk.
+        """
+        # Write to a temporary file first, so an interrupted save can't corrupt
+        # the index.
+        tmp_filename = self.filename + '.tmp'
+        with open(tmp_filename, 'w') as f_out:
+            json.dump({ 'version': self.VERSION, 'mazes': self.mazes, 'files': self.files }, f_out, indent=1)
+        os.replace(tmp_filename, self.filename)
+
+    def add_file(self, filename):
+        """Indexes a maze file.
+
+        Arguments:
+            filename -- the path to the maze file.
+        Returns:
+            the dict of metrics for the maze.
+        """
+        key = self.file_key(filename)
+        stat = os.stat(filename)
+
+        # Skip reading the file if it hasn't changed since it was indexed.
+        known = self.files.get(key)
+        if known and known['mtime'] == stat.st_mtime and known['size'] == stat.st_size and known['hash'] in self.mazes:
+            return self.mazes[known['hash']]
+
+        maze = Maze(filename)
+        self.files[key] = { 'hash': maze.content_hash, 'mtime': stat.st_mtime, 'size': stat.st_size }
+
+        return self.add_maze(maze)
+
+    def add_maze(self, maze):
+        """Indexes a maze.
+
+        Arguments:
+            maze -- the Maze.
+        Returns:
+            the dict of metrics for the maze.
+        """
+        if maze.content_hash not in self.mazes:
+            self.mazes[maze.content_hash] = MazeIndex.measure(maze)
+
+        return self.mazes[maze.content_hash]
+
+    def metrics(self, filename):
+        """Gets the metrics for an indexed maze file.
+
+        Arguments:
+            filename -- the path to the maze file.
+        Returns:
+            the dict of metrics, or None if the file hasn't been indexed.
+        """
+        known = self.files.get(self.file_key(filename))
+        if not known:
+            return None
+
+        return self.mazes.get(known['hash'])
+
+    def file_key(self, filename):
+        """Gets the key of a maze file, its path from the index's directory.
+
+        Arguments:
+            filename -- the path to the maze file, from the working directory.
+        Returns:
+            the key.
+        """
+        return os.path.relpath(os.path.abspath(filename), self.root)
+
+    def query(self, minimums=None, maximums=None):
+        """Finds indexed maze files with metrics in the given ranges.
+
+        Arguments:
+            minimums -- a dict of the lowest allowed value for each metric.
+            maximums -- a dict of the highest allowed value for each metric.
+        Returns:
+            a list of (filename, metrics) tuples, ordered by filename. The
+            filenames are absolute paths.
+        """
+        minimums = minimums or dict()
+        maximums = maximums or dict()
+        for metric in list(minimums) + list(maximums):
+            if metric not in self.METRICS:
+                raise Exception(f"Unknown metric '{metric}', must be one of {self.METRICS}.")
+
+        results = []
+        for key, known in sorted(self.files.items()):
+            metrics = self.mazes.get(known['hash'])
+            if metrics is None:
+                continue
+
+            # Unreachable goals have no optimal score, and fail any range on it.
+            if any(metrics[m] is None or metrics[m] < v for m, v in minimums.items()):
+                continue
+            if any(metrics[m] is None or metrics[m] > v for m, v in maximums.items()):
+                continue
+
+            results.append((os.path.join(self.root, key), metrics))
+
+        return results
+
+    def measure(maze):
+        """Calculates the difficulty metrics of a maze.
+
+        Arguments:
+            maze -- the Maze.
+        Returns:
+            a dict with:
+            - dim: the maze dimension.
+            - dead_ends: the number of squares with one exit.
+            - junctions: the number of squares with three or more exits.
+            - branching_factor: the mean number of onward exits at junctions.
+            - longest_corridor: the most squares in a straight, unbroken line.
+            - loops: the number of independent loops, i.e. passages beyond
+                those needed to connect each region of the maze.
+            - optimal: the fewest steps from the start to the goal, or None if
+                the goal can't be reached.
+        """
+        # Count the exits from each square.
+        exits = MazeIndex.OPENINGS[maze.walls]
+        junctions = exits >= 3
+        branching_factor = float((exits[junctions] - 1).mean()) if junctions.any() else 0.0
+
+        # A connected region of n squares needs n - 1 passages, the rest form loops.
+        passages = int(exits.sum()) // 2
+        loops = passages - maze.dim * maze.dim + MazeIndex.count_regions(maze)
+
+        optimal, _ = Solver(maze).solve()
+
+        return {
+            'dim': int(maze.dim),
+            'dead_ends': int((exits == 1).sum()),
+            'junctions': int(junctions.sum()),
+            'branching_factor': branching_factor,
+            'longest_corridor': int(maze.wall_distances.max()) + 1,
+            'loops': int(loops),
+            'optimal': optimal
+        }
+
+    def count_regions(maze):
+        """Counts the connected regions of a maze.
+
+        Labels each square with the lowest square number it's connected to,
+        merging labels across passages and following them to their roots until
+        nothing changes.
+
+        Arguments:
+            maze -- the Maze.
+        Returns:
+            the number of regions.
+        """
+        dim = maze.dim
+
+        # Squares are numbered x * dim + y. List the squares either side of
+        # each open east and north passage.
+        squares = np.arange(dim * dim).reshape(dim, dim)
+        east = maze.walls[:-1, :] & maze.HEADING_DECIMAL_MAP[Heading.EAST] != 0
+        north = maze.walls[:, :-1] & maze.HEADING_DECIMAL_MAP[Heading.NORTH] != 0
+        u = np.concatenate((squares[:-1, :][east], squares[:, :-1][north]))
+        v = np.concatenate((squares[1:, :][east], squares[:, 1:][north]))
+
+        labels = np.arange(dim * dim)
+        while True:
+            # Find passages joining different labels.
+            lu, lv = labels[u], labels[v]
+            joining = lu != lv
+            if not joining.any():
+                break
+
+            # Point the higher root label at the lower one.
+            np.minimum.at(labels, np.maximum(lu, lv)[joining], np.minimum(lu, lv)[joining])
+
+            # Follow the labels back to their roots.
+            while True:
+                roots = labels[labels]
+                if np.array_equal(roots, labels):
+                    break
+                labels = roots
+
+        return len(np.unique(labels))
@@ -0,0 +1,84 @@
+import json
+from array import array
+import numpy as np
+
+class LatencyProfiler:
+    # Operations timed on every step.
+    OPERATIONS = ('next_move', 'sensor_readings', 'valid_move')
+
+    # Percentiles reported for each operation.
+    PERCENTILES = (50, 90, 99)
+
+    # Upper bounds of the histogram buckets in microseconds, 1-2-5 spaced.
+    # A last bucket holds anything slower.
+    BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 50000, 100000)
+
+    def __init__(self):
+        """Collects the time taken by each step's operations.
+
+        Every sample is kept, so the tails can be reported exactly.
+        """
+        self.samples = dict()
+
+    def record(self, mouse_name, operation, phase, ns):
+        """Records the time an operation took.
+
+        Arguments:
+            mouse_name -- the name of the mouse class.
+            operation -- the operation, one of OPERATIONS.
+            phase -- the Phase of the step.
+            ns -- the time taken in nanoseconds.
+        """
+        key = (mouse_name, operation, phase.name)
+        if key not in self.samples:
+            self.samples[key] = array('q')
+        self.samples[key].append(ns)
+
+    def merge(self, other):
+        """Adds the samples from another profiler, e.g. from another process.
+
+        Arguments:
+            other -- the LatencyProfiler to merge.
+        """
+        for key, samples in other.samples.items():
+            if key not in self.samples:
+                self.samples[key] = array('q')
+            self.samples[key].extend(samples)
+
+    def summary(self):
+        """Summarises the latency of each operation.
+
+        Returns:
+            a list of dicts with the 'mouse', 'operation', 'phase', the number
+            of samples as 'count', 'p50', 'p90', 'p99' and 'max' latencies in
+            microseconds, and the 'histogram', a list of dicts with the
+            'count' of samples at or below each bucket's upper bound 'le' and
+            above the last. The last bucket's 'le' is None. Ordered by mouse,
+            then phase, then operation.
+        """
+        phases = ('PLAN', 'EXECUTE')
+        keys = sorted(self.samples, key=lambda k: (k[0], phases.index(k[2]), self.OPERATIONS.index(k[1])))
+
+        rows = []
+        for mouse_name, operation, phase in keys:
+            us = np.frombuffer(self.samples[(mouse_name, operation, phase)], dtype=np.int64) / 1000
+            row = { 'mouse': mouse_name, 'operation': operation, 'phase': phase, 'count': len(us) }
+            for p, value in zip(self.PERCENTILES, np.percentile(us, self.PERCENTILES)):
+                row[f"p{p}"] = float(value)
+            row['max'] = float(us.max())
+
+            # Bucket i holds the samples above BUCKETS[i - 1], up to BUCKETS[i].
+            counts = np.bincount(np.searchsorted(self.BUCKETS, us), minlength=len(self.BUCKETS) + 1)
+            row['histogram'] = [{'le': le, 'count': int(c)} for le, c in zip(self.BUCKETS + (None,), counts)]
+            rows.append(row)
+
+        return rows
+
+    def write_json(self, filename):
+        """Writes the summary as JSON.
+
+        Arguments:
+            filename -- the path to the output file.
+        """
+        with open(filename, 'w') as f_out:
+            json.dump(self.summary(), f_out, indent=1)
@@ -0,0 +1,72 @@
+import sys
+import logging
+
+# Every component logs under this name, e.g. 'robomouse.controller'.
+ROOT = 'robomouse'
+
+# The step currently being played, used to sample step-by-step messages.
+step = 0
+
+class StepSampler(logging.Filter):
+    def __init__(self, every):
+        """Lets through debug messages from every nth step only.
+
+        Messages above debug level, e.g. a mouse reaching the goal, are always
+        let through.
+
+        Arguments:
+            every -- log debug messages from steps that are a multiple of this.
+        """
+        super().__init__()
+        self.every = every
+
+    def filter(self, record):
+        record.step = step
+        return record.levelno > logging.DEBUG or step % self.every == 0
+
+def get_logger(component):
+    """Gets the logger for a component.
+
+    Messages should pass their values as arguments, e.g.
+    'logger.debug("Pos: %s", pos)', so they're only formatted when logged.
+
+    Arguments:
+        component -- the component's name, e.g. 'controller' or 'mouse.AStarMouse'.
+    Returns:
+        the logging.Logger.
+    """
+    return logging.getLogger(f"{ROOT}.{component}")
+
+def set_step(new_step):
+    """Records the step being played.
+
+    Arguments:
+        new_step -- the step number.
+    """
+    global step
+    step = new_step
+
+def configure(level=logging.WARNING, every=1, stream=sys.stderr):
+    """Sends log messages to a stream.
+
+    Until this is called, only warnings and errors are shown.
+
+    Arguments:
+        level -- the lowest level to log, a logging level or its name.
+        every -- log debug messages from every nth step only.
+        stream -- the stream to write to.
+    """
+    if every < 1:
+        raise Exception(f"Log sampling must be every 1 or more steps, got {every}.")
+
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter('[%(name)s] %(message)s'))
+    handler.addFilter(StepSampler(every))
+
+    # Replace any earlier configuration.
+    logger = logging.getLogger(ROOT)
+    for old_handler in list(logger.handlers):
+        logger.removeHandler(old_handler)
+    logger.addHandler(handler)
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    logger.propagate = False
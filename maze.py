@@ -1,7 +1,10 @@
-import pdb
+import hashlib
+import struct
 import numpy as np
+import log
 from heading import Heading
 from rotation import Rotation
+from solver import Solver
 
 class Maze(object):
     # Maps headings to the axial components.
@@ -12,6 +15,14 @@ class Maze(object):
         Heading.WEST: np.array([-1, 0])
     }
 
+    # Maps heading to its index along the last axis of the distance table.
+    HEADING_INDEX_MAP = {
+        Heading.NORTH: 0,
+        Heading.EAST: 1,
+        Heading.SOUTH: 2,
+        Heading.WEST: 3
+    }
+
     # Maps heading to wall decimal.
     HEADING_DECIMAL_MAP = {
         Heading.NORTH: 1,
@@ -20,8 +31,15 @@ class Maze(object):
         Heading.WEST: 8
     }
 
-    def __init__(self, filename):
-        """Reads in a maze file.
+    # Binary maze files start with a fixed-size header of: magic bytes,
+    # format version, dimension and the SHA-256 hash of the wall bytes. The
+    # header is padded to 64 bytes and followed by one uint8 per square.
+    BINARY_MAGIC = b'RMAZ'
+    BINARY_VERSION = 1
+    BINARY_HEADER = struct.Struct('<4sB3xI32s20x')
+
+    def __init__(self, filename=None, walls=None):
+        """Reads in a maze file, or builds a maze from walls already in memory.
 
         Maze objects have two main attributes:
         - dim: mazes should be square, with sides of even length. (integer)
@@ -31,24 +49,31 @@ class Maze(object):
             4s register the bottom edge, and 8s register the left edge. (numpy
             array)
 
+        Maze files are either comma-separated text, with the dimension on the
+        first line and a row of squares per line, or the binary format written
+        by 'write_binary'. Binary files are memory-mapped rather than read, so
+        processes loading the same maze share one copy of the walls.
+
         The initialization function also performs some consistency checks for
         wall positioning.
 
         Arguments:
             filename -- the path to the maze file.
+            walls -- a square numpy array of walls, used instead of a file.
         """
-        with open(filename, 'r') as f_in:
-            # Read lines of file.
-            lines = [line for line in f_in]
-
-            # First line should be an integer with the maze dimensions
-            self.dim = int(lines[0])
-
-            # Subsequent lines describe the permissability of walls
-            walls = []
-            for line in lines[1:]:
-                walls.append(list(map(int, line.strip().split(','))))
-            self.walls = np.array(walls)
+        # Read the maze in whichever format it was written.
+        if walls is not None:
+            walls = np.asarray(walls, dtype=np.uint8)
+            self.dim, self.walls = len(walls), walls
+        elif filename is None:
+            raise Exception('Maze needs either a filename or walls!')
+        elif Maze.is_binary(filename):
+            self.dim, self.walls = self.__read_binary(filename)
+        else:
+            self.dim, self.walls = self.__read_text(filename)
+
+        # Hash the walls, so the same maze can be recognised in either format.
+        self.content_hash = Maze.hash_walls(self.walls)
 
         # Perform validation on maze
         # Maze dimensions
@@ -59,27 +84,196 @@ class Maze(object):
 
         # Wall permeability
         wall_errors = []
-        # vertical walls
-        for x in range(self.dim-1):
-            for y in range(self.dim):
-                if (self.walls[x,y] & 2 != 0) != (self.walls[x+1,y] & 8 != 0):
-                    wall_errors.append([(x,y), 'v'])
-        # horizontal walls
-        for y in range(self.dim-1):
-            for x in range(self.dim):
-                if (self.walls[x,y] & 1 != 0) != (self.walls[x,y+1] & 4 != 0):
-                    wall_errors.append([(x,y), 'h'])
+        # vertical walls, compare each square's right edge to its neighbour's
+        # left edge. Errors are indexed by [x, y].
+        v_errors = (self.walls[:-1, :] & 2 != 0) != (self.walls[1:, :] & 8 != 0)
+        for x, y in np.argwhere(v_errors):
+            wall_errors.append([(int(x), int(y)), 'v'])
+        # horizontal walls, compare each square's top edge to its neighbour's
+        # bottom edge. Transpose so errors come out ordered by row.
+        h_errors = (self.walls[:, :-1] & 1 != 0) != (self.walls[:, 1:] & 4 != 0)
+        for y, x in np.argwhere(h_errors.T):
+            wall_errors.append([(int(x), int(y)), 'h'])
 
         if wall_errors:
+            logger = log.get_logger('maze')
             for cell, wall_type in wall_errors:
                 if wall_type == 'v':
                     cell2 = (cell[0]+1, cell[1])
-                    print(f"Inconsistent vertical wall betweeen {cell} and {cell2}")
+                    logger.error("Inconsistent vertical wall betweeen %s and %s", cell, cell2)
                 else:
                     cell2 = (cell[0], cell[1]+1)
-                    print(f"Inconsistent horizontal wall betweeen {cell} and {cell2}")
+                    logger.error("Inconsistent horizontal wall betweeen %s and %s", cell, cell2)
             raise Exception('Consistency errors found in wall specifications!')
 
+        # Precompute distances to the walls and the goal squares. All movement
+        # queries are answered from these tables.
+        self.wall_distances = self.__wall_distances()
+        self.goal_mask = self.__goal_mask()
+
+        # The distance to the goal from every state is costly, so it's only
+        # calculated when first requested.
+        self.__goal_distances = None
+
+    def is_binary(filename):
+        """Checks if a maze file is in the binary format.
+
+        Arguments:
+            filename -- the path to the maze file.
+        Returns:
+            True if the file starts with the binary magic bytes, False otherwise.
+        """
+        with open(filename, 'rb') as f_in:
+            return f_in.read(len(Maze.BINARY_MAGIC)) == Maze.BINARY_MAGIC
+
+    def hash_walls(walls):
+        """Calculates the content hash of a maze.
+
+        Arguments:
+            walls -- the walls of the maze.
+        Returns:
+            the hex SHA-256 digest of the walls stored as one uint8 per square.
+        """
+        return hashlib.sha256(np.ascontiguousarray(walls, dtype=np.uint8).tobytes()).hexdigest()
+
+    def __read_text(self, filename):
+        """Reads a comma-separated text maze file.
+
+        Arguments:
+            filename -- the path to the maze file.
+        Returns:
+            the maze dimension and a numpy array of walls.
+        """
+        with open(filename, 'r') as f_in:
+            # First line should be an integer with the maze dimensions
+            dim = int(f_in.readline())
+
+            # Subsequent lines describe the permissability of walls. Read them
+            # in one go, ragged rows can't be a valid maze.
+            try:
+                walls = np.loadtxt(f_in, delimiter=',', dtype=np.uint8, ndmin=2)
+            except ValueError:
+                raise Exception('Maze shape does not match dimension attribute!')
+
+        return dim, walls
+
+    def __read_binary(self, filename):
+        """Memory-maps a binary maze file.
+
+        Arguments:
+            filename -- the path to the maze file.
+        Returns:
+            the maze dimension and a read-only memory-mapped array of walls.
+        """
+        # Read the header.
+        with open(filename, 'rb') as f_in:
+            header = f_in.read(self.BINARY_HEADER.size)
+        if len(header) != self.BINARY_HEADER.size:
+            raise Exception('Binary maze header is truncated!')
+        _, version, dim, digest = self.BINARY_HEADER.unpack(header)
+        if version != self.BINARY_VERSION:
+            raise Exception(f"Unsupported binary maze version {version}!")
+
+        # Map the walls straight from the file.
+        try:
+            walls = np.memmap(filename, dtype=np.uint8, mode='r', offset=self.BINARY_HEADER.size, shape=(dim, dim))
+        except ValueError:
+            raise Exception('Maze shape does not match dimension attribute!')
+
+        # Check the walls haven't been corrupted.
+        if hashlib.sha256(walls).digest() != digest:
+            raise Exception('Maze content hash does not match header!')
+
+        return dim, walls
+
+    def write_text(self, filename):
+        """Writes the maze as a comma-separated text file.
+
+        Arguments:
+            filename -- the path to write to.
+        """
+        with open(filename, 'w') as f_out:
+            f_out.write(f"{self.dim}\n")
+            np.savetxt(f_out, self.walls, fmt='%d', delimiter=',')
+
+    def write_binary(self, filename):
+        """Writes the maze in the binary format.
+
+        Arguments:
+            filename -- the path to write to.
+        """
+        walls = np.ascontiguousarray(self.walls, dtype=np.uint8)
+        digest = hashlib.sha256(walls).digest()
+        header = self.BINARY_HEADER.pack(self.BINARY_MAGIC, self.BINARY_VERSION, self.dim, digest)
+
+        with open(filename, 'wb') as f_out:
+            f_out.write(header)
+            f_out.write(walls.tobytes())
+
+    def __wall_distances(self):
+        """Builds a table of the distance to the wall from every square in every heading.
+
+        Returns:
+            a (dim, dim, 4) numpy array, indexed by [x, y, heading index].
+        """
+        # Distances never exceed the dimension, so use the smallest type that
+        # holds it.
+        distances = np.zeros((self.dim, self.dim, 4), dtype=np.min_scalar_type(self.dim))
+
+        for heading, idx in self.HEADING_INDEX_MAP.items():
+            # Rotate the permissability and distance grids so that the heading
+            # points along increasing x. The rotated distances are a view, so
+            # writing to them fills in the table.
+            k = (idx - 1) % 4
+            permissible = np.rot90(self.walls & self.HEADING_DECIMAL_MAP[heading] != 0, k)
+            heading_distances = np.rot90(distances[:, :, idx], k)
+
+            # Sweep back from the far edge. A square's distance is one more than
+            # its neighbour's if there's no wall between them. Squares on the
+            # far edge can't move off the maze.
+            for x in range(self.dim - 2, -1, -1):
+                heading_distances[x] = np.where(permissible[x], heading_distances[x + 1] + 1, 0)
+
+        return distances
+
+    def __goal_mask(self):
+        """Builds a mask of the goal squares.
+
+        Returns:
+            a (dim, dim) boolean numpy array, True for squares in the goal.
+        """
+        # The goal is the centre 2x2 box of the maze.
+        goal_mask = np.zeros((self.dim, self.dim), dtype=bool)
+        centre = self.dim // 2
+        goal_mask[centre - 1:centre + 1, centre - 1:centre + 1] = True
+
+        return goal_mask
+
+    def goal_distances(self):
+        """Gets the fewest steps to reach the goal from every state.
+
+        Calculated on first request and cached.
+
+        Returns:
+            a (dim, dim, 4) numpy array indexed by [x, y, heading index]. Goal
+            squares are 0, and states that can't reach the goal are -1.
+        """
+        if self.__goal_distances is None:
+            self.__goal_distances = Solver(self).goal_distances()
+
+        return self.__goal_distances
+
+    def goal_distance(self, pos, heading):
+        """Gets the fewest steps to reach the goal from a state.
+
+        Arguments:
+            pos -- the [x, y] position.
+            heading -- a Heading, e.g. Heading.NORTH.
+        Returns:
+            the number of steps, or -1 if the goal can't be reached.
+        """
+        return int(self.goal_distances()[pos[0], pos[1], self.HEADING_INDEX_MAP[heading]])
+
     def is_permissible(self, pos, heading):
         """Tells if we can move from a square in a heading.
 
@@ -101,16 +295,7 @@ class Maze(object):
         Return:
             an integer distance. The number of moves that can be made in that direction.
         """
-        # Copy the pos as we're modifying it.
-        curr_pos = pos.copy()
-
-        distance = 0
-        while self.is_permissible(curr_pos, heading):
-            distance += 1
-            curr_pos[0] += self.HEADING_COMPONENTS_MAP[heading][0]
-            curr_pos[1] += self.HEADING_COMPONENTS_MAP[heading][1]
-
-        return distance
+        return int(self.wall_distances[pos[0], pos[1], self.HEADING_INDEX_MAP[heading]])
 
     def new_pos(self, pos, heading, move):
         """Returns the new position after moving.
@@ -123,10 +308,10 @@ class Maze(object):
             A list of [x, y] int components, showing the new position.
         """
         # Get x, y changes.
-        dx, dy = move * self.HEADING_COMPONENTS_MAP[heading] 
+        dx, dy = self.HEADING_COMPONENTS_MAP[heading]
 
         # Update x, y co-ordinates.
-        x_new, y_new = pos[0] + dx, pos[1] + dy
+        x_new, y_new = pos[0] + move * dx, pos[1] + move * dy
 
         return [int(x_new), int(y_new)]
         
@@ -139,16 +324,43 @@ class Maze(object):
         Returns:
             A tuple of sensor readings, each giving the distance to the wall in the (left, middle, right) directions.
         """
-        # Get left and right headings.
-        l_head = heading.rotate(Rotation.LEFT)
-        r_head = heading.rotate(Rotation.RIGHT)
+        # Load the distances in every heading from this square.
+        distances = self.wall_distances[pos[0], pos[1]].tolist()
+
+        # Left and right headings are the neighbouring indexes.
+        idx = self.HEADING_INDEX_MAP[heading]
+        l_idx, r_idx = (idx - 1) % 4, (idx + 1) % 4
+
+        return (distances[l_idx], distances[idx], distances[r_idx])
+
+    def sensor_readings_batch(self, positions, headings):
+        """Calculates the sensor readings for many mice at once.
+
+        Arguments:
+            positions -- an (n, 2) numpy array of [x, y] positions.
+            headings -- an (n,) numpy array of heading indexes.
+        Returns:
+            an (n, 3) numpy array of distances to the wall in the (left, middle, right) directions.
+        """
+        # Index the left, middle and right headings of each mouse.
+        sensor_headings = (headings[:, None] + np.array([-1, 0, 1])) % 4
+
+        return self.wall_distances[positions[:, 0, None], positions[:, 1, None], sensor_headings]
 
-        # Get distances for each heading.
-        dist = self.dist_to_wall(pos, heading)
-        l_dist = self.dist_to_wall(pos, l_head) 
-        r_dist = self.dist_to_wall(pos, r_head) 
+    def valid_move_batch(self, positions, headings, sizes):
+        """Checks many moves at once in the context of the maze.
 
-        return (l_dist, dist, r_dist)
+        Arguments:
+            positions -- an (n, 2) numpy array of [x, y] positions.
+            headings -- an (n,) numpy array of heading indexes to move in.
+            sizes -- an (n,) numpy array of move sizes. Positive or negative.
+        Returns:
+            an (n,) boolean numpy array, True for valid moves.
+        """
+        # Negative moves travel backwards.
+        travel = np.where(sizes < 0, (headings + 2) % 4, headings)
+
+        return np.abs(sizes) <= self.wall_distances[positions[:, 0], positions[:, 1], travel]
 
     def reached_goal(self, pos):
         """Is the position within the goal?
@@ -158,14 +370,11 @@ class Maze(object):
         Returns:
             True if goal reached, else False.
         """
-        # Both axes will have the same goal co-ordinates.
-        goal_coords = [self.dim / 2 -1, self.dim / 2]
-
-        # Check if position in goal.
-        if not (pos[0] in goal_coords and pos[1] in goal_coords):
+        # Positions outside the maze can't be in the goal.
+        if not (0 <= pos[0] < self.dim and 0 <= pos[1] < self.dim):
             return False
 
-        return True
+        return bool(self.goal_mask[int(pos[0]), int(pos[1])])
 
     def valid_move(self, pos, heading, size):
         """Checks if the mouse's move is valid in the context of the maze.
@@ -181,17 +390,13 @@ class Maze(object):
         if not self.pos_exists(pos):
             return False
             
-        # Get the move heading.
-        move_heading = heading
-        dir = (-1, 1)[size > 0]
-        if dir == -1:
-            move_heading = move_heading.opposite()
-
-        # Get distance to the wall.
-        dist = self.dist_to_wall(pos, move_heading)
+        # Get the move heading. Negative moves travel backwards.
+        idx = self.HEADING_INDEX_MAP[heading]
+        if size < 0:
+            idx = (idx + 2) % 4
 
         # Is the move size larger than the distance to the wall?
-        if abs(size) > dist:
+        if abs(size) > self.wall_distances[pos[0], pos[1], idx]:
             return False
 
         return True
@@ -204,9 +409,10 @@ class Maze(object):
         Returns:
             True if position exists, False otherwise.
         """
-        # Check that position is integer.
-        if not isinstance(pos[0], np.int8) or not isinstance(pos[1], np.int8):
-            return False
+        # Check that position is integer, of any width.
+        for p in pos[:2]:
+            if not isinstance(p, (int, np.integer)) or isinstance(p, bool):
+                return False
 
         # Check against maze dimensions.
         if not (pos[0] >= 0 and pos[0] < self.dim) or not (pos[1] >= 0 and
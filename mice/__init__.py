@@ -1,8 +1,103 @@
-from mice.blind_mouse import BlindMouse
-from mice.danger_mouse import DangerMouse
-from mice.reversing_danger_mouse import ReversingDangerMouse
-from mice.magnetic_mouse import MagneticMouse
-from mice.dead_end_mouse import DeadEndMouse
-from mice.trémaux_mouse import TrémauxMouse
-from mice.a_star_mouse import AStarMouse
+import os
+import sys
+import importlib
+import importlib.util
 
+# The bundled mice, by class name, and the module each is in. They're only
+# imported when asked for.
+BUNDLED = {
+    'BlindMouse': 'mice.blind_mouse',
+    'DangerMouse': 'mice.danger_mouse',
+    'ReversingDangerMouse': 'mice.reversing_danger_mouse',
+    'MagneticMouse': 'mice.magnetic_mouse',
+    'DeadEndMouse': 'mice.dead_end_mouse',
+    'TrémauxMouse': 'mice.trémaux_mouse',
+    'AStarMouse': 'mice.a_star_mouse'
+}
+
+def names():
+    """Lists the bundled mice.
+
+    Returns:
+        a list of mouse class names.
+    """
+    return list(BUNDLED)
+
+def is_file(spec):
+    """Tells if a mouse spec names a file, e.g. 'my_mouse.py' or 'my_mouse.py:MyMouse'.
+    """
+    return spec.partition(':')[0].endswith('.py')
+
+def absolute(spec):
+    """Makes a file spec's path absolute, so it can be resolved from any directory.
+
+    Arguments:
+        spec -- a mouse spec, as for 'get_mouse'.
+    Returns:
+        the spec, with any file path made absolute.
+    """
+    if not is_file(spec):
+        return spec
+    path, colon, class_name = spec.partition(':')
+
+    return os.path.abspath(path) + colon + class_name
+
+def get_mouse(spec):
+    """Finds a mouse class, importing its module only now.
+
+    Arguments:
+        spec -- the name of a bundled mouse, e.g. 'AStarMouse', a dotted
+            path to a class, e.g. 'my_package.my_module.MyMouse', or the path
+            to a Python file, e.g. 'my_mouse.py', optionally followed by
+            ':ClassName'. A file without a class name must define exactly
+            one class with a 'next_move' method.
+    Returns:
+        the mouse class.
+    """
+    if spec in BUNDLED:
+        return getattr(importlib.import_module(BUNDLED[spec]), spec)
+
+    # Load a mouse from a file, keeping the module so it's only loaded once.
+    if is_file(spec):
+        path, _, class_name = spec.partition(':')
+        if not os.path.exists(path):
+            raise Exception(f"Mouse file '{path}' doesn't exist.")
+        module_name = 'mice.file.' + os.path.splitext(os.path.basename(os.path.abspath(path)))[0]
+        module = sys.modules.get(module_name)
+        if module is None or os.path.abspath(module.__file__) != os.path.abspath(path):
+            loader_spec = importlib.util.spec_from_file_location(module_name, path)
+            module = importlib.util.module_from_spec(loader_spec)
+            sys.modules[module_name] = module
+            loader_spec.loader.exec_module(module)
+
+        # Find the mouse class defined in the file.
+        if class_name:
+            mouse_class = getattr(module, class_name, None)
+        else:
+            classes = [v for v in vars(module).values() if isinstance(v, type) and v.__module__ == module_name and hasattr(v, 'next_move')]
+            if len(classes) != 1:
+                raise Exception(f"Mouse file '{path}' defines {len(classes)} mouse classes, name one with '{path}:ClassName'.")
+            mouse_class = classes[0]
+    else:
+        # Import the module of a dotted path.
+        module_name, _, class_name = spec.rpartition('.')
+        if not module_name:
+            raise Exception(f"Mouse '{spec}' isn't a bundled mouse, dotted path or file.")
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError as e:
+            raise Exception(f"Mouse module '{module_name}' can't be imported: {e}")
+        mouse_class = getattr(module, class_name, None)
+
+    if not isinstance(mouse_class, type):
+        raise Exception(f"Mouse '{spec}' isn't a class.")
+
+    return mouse_class
+
+def __getattr__(name):
+    """Imports bundled mice when they're first used as attributes, e.g. 'mice.AStarMouse'.
+    """
+    if name in BUNDLED:
+        return get_mouse(name)
+
+    raise AttributeError(f"module 'mice' has no attribute '{name}'")
@@ -1,10 +1,9 @@
-import pdb
 import numpy as np
 from rotation import Rotation
 
 class BlindMouse():
     def __init__(self, maze_dim, init_state, verbose):
-        pass
+        self.rng = np.random
     
     def next_move(self, sensors):
         """Selects the move randomly from all options.
@@ -17,16 +16,16 @@ class BlindMouse():
         """
         # A certain percentage of the time we should try to reset.
         p = 0.05
-        reset = np.random.choice([0, 1], p=[(1 - p), p])
+        reset = self.rng.choice([0, 1], p=[(1 - p), p])
         if reset:
             return 'RESET', 'RESET'
         
         # Get random rotation. Assign a lower prob to reset.
-        rot = np.random.choice(Rotation)
+        rot = self.rng.choice(Rotation)
 
         # Get random move.
         move_opts = range(-3, 4)
-        move = np.random.choice(move_opts)
+        move = self.rng.choice(move_opts)
 
         return rot, move
 
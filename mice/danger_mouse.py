@@ -1,5 +1,3 @@
-import random
-import pdb
 import numpy as np
 from rotation import Rotation
 from sensor import Sensor
@@ -8,7 +6,8 @@ class DangerMouse:
     MAX_MOVE = 3
 
     def __init__(self, maze_dim, init_state, verbose):
-        pass
+        self.rng = np.random
+        self.rngs = None
 
     def next_move(self, sensors):
         """Selects the move randomly, but avoids walls. He's sick of banging his head.
@@ -20,9 +19,14 @@ class DangerMouse:
             rot -- the next rotation in degrees.
             move -- an integer for the next move.
         """
+        return self.choose_move(sensors, self.rng)
+
+    def choose_move(self, sensors, rng):
+        """Selects the move randomly, drawing from the given random stream.
+        """
         # A certain percentage of the time we should try to reset.
         p = 0.05
-        reset = np.random.choice([0, 1], p=[(1 - p), p])
+        reset = rng.choice([0, 1], p=[(1 - p), p])
         if reset:
             return 'RESET', 'RESET'
 
@@ -34,12 +38,39 @@ class DangerMouse:
             return Rotation.LEFT, 0
         
         # Choose a rotation randomly from those directions. 
-        idx = random.choice(non_zero_idx)
+        idx = rng.choice(non_zero_idx)
         rot = Sensor(idx).rotation()
         
         # Choose a random move in the forward direction.
         max_move = min([sensors[idx], self.MAX_MOVE])
-        move = random.choice(range(1, max_move + 1))
+        move = rng.choice(range(1, max_move + 1))
 
         return rot, move
 
+    def next_moves(self, readings):
+        """Selects moves for many games at once, in the same way as 'next_move'.
+
+        Each game draws from its own stream in 'rngs', if given, in the same
+        order as 'next_move', so a batch plays the same games as single runs
+        with the same seeds. Otherwise every game draws from 'rng'.
+
+        Arguments:
+            readings -- an (n, 3) numpy array of left, front and right sensor readings.
+        Returns:
+            rots -- an (n,) numpy array of rotations in degrees.
+            moves -- an (n,) numpy array of moves.
+            resets -- an (n,) boolean numpy array, True where we try to reset.
+        """
+        n = len(readings)
+        rngs = self.rngs if self.rngs is not None else [self.rng] * n
+        rots = np.zeros(n, dtype=np.int64)
+        moves = np.zeros(n, dtype=np.int64)
+        resets = np.zeros(n, dtype=bool)
+        for i in range(n):
+            rot, move = self.choose_move(tuple(readings[i].tolist()), rngs[i])
+            if (rot, move) == ('RESET', 'RESET'):
+                resets[i] = True
+            else:
+                rots[i], moves[i] = rot.value, move
+
+        return rots, moves, resets
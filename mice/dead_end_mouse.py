@@ -1,5 +1,3 @@
-import random
-import pdb
 import numpy as np
 from heading import Heading
 from rotation import Rotation
@@ -11,9 +9,11 @@ class DeadEndMouse():
     MAX_MOVE = 3
 
     def __init__(self, maze_dim, init_state, verbose):
+        self.rng = np.random
+
         self.state = State(init_state['pos'], init_state['heading'])
         self.maze_dim = maze_dim
-        self.dead_ends = np.zeros((maze_dim, maze_dim))
+        self.dead_ends = np.zeros((maze_dim, maze_dim), dtype=bool)
         pass
 
     def random_move_vec(self, sensor, reading):
@@ -36,7 +36,7 @@ class DeadEndMouse():
         if len(poss_move_vecs) == 0:
             return None
         else:
-            idx = np.random.choice(len(poss_move_vecs))
+            idx = self.rng.choice(len(poss_move_vecs))
             return poss_move_vecs[idx]
 
     def in_goal(self):
@@ -94,7 +94,7 @@ class DeadEndMouse():
             return Rotation.LEFT, 0
         
         # Get an index based on the probs.
-        sensor = np.random.choice(sensors)
+        sensor = self.rng.choice(sensors)
         
         # Get the rotation and move to perform.
         rot = sensor.rotation()
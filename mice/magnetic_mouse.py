@@ -1,6 +1,5 @@
-import random
-import pdb
 import numpy as np
+import log
 from heading import Heading
 from rotation import Rotation
 from sensor import Sensor
@@ -13,10 +12,13 @@ class MagneticMouse():
     def __init__(self, maze_dim, init_state, verbose):
         """Sets up the mouse's initial state.
         """
+        self.rng = np.random
+
         self.state = State(init_state['pos'], init_state['heading'])
         self.maze_centre = np.array([(maze_dim - 1) / 2, (maze_dim - 1) / 2])
-        self.dead_ends = np.zeros((maze_dim, maze_dim))
+        self.dead_ends = np.zeros((maze_dim, maze_dim), dtype=bool)
         self.verbose = verbose
+        self.log = log.get_logger(f"mouse.{type(self).__name__}")
         self.reached_goal = False
         self.maze_dim = maze_dim
         self.phase = Phase.PLAN
@@ -55,15 +57,12 @@ class MagneticMouse():
         if len(poss_move_vecs) == 0:
             return None
         else:
-            idx = np.random.choice(len(poss_move_vecs))
+            idx = self.rng.choice(len(poss_move_vecs))
             return poss_move_vecs[idx]
 
     def next_move(self, readings):
-        # Print mouse's assumed location.
-        if self.verbose:
-            print(f"[MOUSE] Phase: {self.phase.value}")
-            print(f"[MOUSE] Pos: {self.state.pos}")
-            print(f"[MOUSE] Heading: {self.state.heading.value}")
+        # Log mouse's assumed location.
+        self.log.debug("Phase: %s, pos: %s, heading: %s", self.phase.value, self.state.pos, self.state.heading.value)
 
         # Update mouse's state.
         rot, move = self.make_move(readings)
@@ -75,11 +74,10 @@ class MagneticMouse():
         # Check if we're in the goal.
         if self.in_goal():
             self.reached_goal = True
-            if self.verbose:
-                print(f"[MOUSE] Reached goal.")
+            self.log.info("Reached goal.")
 
             if self.phase == Phase.EXECUTE:
-                if self.verbose: print(f"[MOUSE] Finished.")
+                self.log.info("Finished.")
 
         return rot, move
 
@@ -98,7 +96,7 @@ class MagneticMouse():
     def make_move(self, readings):
         # Check if we should reset.
         if self.phase == Phase.PLAN and self.reached_goal:
-            if self.verbose: print(f"[MOUSE] Finished planning.")
+            self.log.info("Finished planning.")
             self.phase = Phase.EXECUTE
             self.state.reset()
             return 'RESET', 'RESET'
@@ -139,7 +137,7 @@ class MagneticMouse():
         probs = self.softmax(weights)
         
         # Get an index based on the probs.
-        sensor = np.random.choice(sensors, p=probs)
+        sensor = self.rng.choice(sensors, p=probs)
         
         # Get the rotation and move to perform.
         rot = sensor.rotation()
@@ -1,5 +1,3 @@
-import random
-import pdb
 import numpy as np
 from rotation import Rotation
 from sensor import Sensor
@@ -8,7 +6,7 @@ class ReversingDangerMouse:
     MAX_MOVE = 3
 
     def __init__(self, maze_dim, init_state, verbose):
-        pass
+        self.rng = np.random
 
     def next_move(self, sensors):
         """Selects the move randomly, but avoids walls. He's sick of banging his head.
@@ -22,7 +20,7 @@ class ReversingDangerMouse:
         """
         # A certain percentage of the time we should try to reset.
         p = 0.05
-        reset = np.random.choice([0, 1], p=[(1 - p), p])
+        reset = self.rng.choice([0, 1], p=[(1 - p), p])
         if reset:
             return 'RESET', 'RESET'
 
@@ -31,15 +29,15 @@ class ReversingDangerMouse:
 
         # If all sensors are blank, back up the truck.
         if len(non_zero_idx) == 0:
-            return Rotation.NONE, np.random.choice(range(-3, 0))
+            return Rotation.NONE, self.rng.choice(range(-3, 0))
         
         # Choose a rotation randomly from those directions. 
-        idx = random.choice(non_zero_idx)
+        idx = self.rng.choice(non_zero_idx)
         rot = Sensor(idx).rotation()
         
         # Choose a random move in the forward direction.
         max_move = min([sensors[idx], self.MAX_MOVE])
-        move = random.choice(range(1, max_move + 1))
+        move = self.rng.choice(range(1, max_move + 1))
 
         return rot, move
 
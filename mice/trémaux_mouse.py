@@ -1,5 +1,5 @@
-import pdb
 import numpy as np
+import log
 from heading import Heading
 from rotation import Rotation
 from sensor import Sensor
@@ -11,6 +11,8 @@ class TrémauxMouse():
     MAX_MOVE = 3
 
     def __init__(self, maze_dim, init_state, verbose):
+        self.rng = np.random
+
         # Initialise the state.
         self.state = State(init_state['pos'], init_state['heading'])
 
@@ -29,10 +31,30 @@ class TrémauxMouse():
         self.reading = None
         self.reached_goal = False
         self.verbose = verbose
+        self.log = log.get_logger(f"mouse.{type(self).__name__}")
 
         # Create the graph.
         self.graph = Graph()
 
+    def snapshot(self):
+        """Saves the mouse's state, so the controller can restore it before each run.
+        """
+        snapshot = dict(self.__dict__)
+        snapshot['state'] = self.state.copy()
+        snapshot['graph'] = self.graph.copy()
+
+        return snapshot
+
+    def restore(self, snapshot):
+        """Returns the mouse to a saved state.
+
+        Arguments:
+            snapshot -- a state saved by 'snapshot'.
+        """
+        self.__dict__ = dict(snapshot)
+        self.state = snapshot['state'].copy()
+        self.graph = snapshot['graph'].copy()
+
     def unit_centre(self):
         """Finds the unit vector from the mouse to the centre.
         """
@@ -53,11 +75,8 @@ class TrémauxMouse():
         return pos[0] + self.maze_dim * pos[1]
 
     def next_move(self, readings):
-        # Print mouse's assumed location.
-        if self.verbose:
-            print(f"[MOUSE] Phase: {self.phase.value}")
-            print(f"[MOUSE] Pos: {self.state.pos}")
-            print(f"[MOUSE] Heading: {self.state.heading.value}")
+        # Log mouse's assumed location.
+        self.log.debug("Phase: %s, pos: %s, heading: %s", self.phase.value, self.state.pos, self.state.heading.value)
 
         # Get the mouse's next move.
         rot, move = self.plan_move(readings)
@@ -69,11 +88,10 @@ class TrémauxMouse():
         # check if we're in the goal.
         if self.in_goal():
             self.reached_goal = True
-            if self.verbose:
-                print(f"[MOUSE] reached goal.")
+            self.log.info("Reached goal.")
 
             if self.phase == Phase.EXECUTE:
-                if self.verbose: print(f"[MOUSE] finished.")
+                self.log.info("Finished.")
 
         return rot, move
 
@@ -158,7 +176,7 @@ class TrémauxMouse():
 
         # Check if we should reset.
         if self.phase == Phase.PLAN and self.reached_goal:
-            if self.verbose: print(f"[MOUSE] Finished planning.")
+            self.log.info("Finished planning.")
 
             # Begin execution phase.
             self.phase = Phase.EXECUTE
@@ -289,7 +307,7 @@ class TrémauxMouse():
         probs = self.softmax(weights)
         
         # Get a sensor based on the probs.
-        sensor = np.random.choice(sensors, p=probs)
+        sensor = self.rng.choice(sensors, p=probs)
         idx = np.where(sensors == sensor)[0][0]
 
         # Get the rotation and move to perform.
@@ -0,0 +1,518 @@
+import os
+import sys
+import json
+import time
+import atexit
+import random
+import struct
+import weakref
+import threading
+import subprocess
+import numpy as np
+import mice
+import log
+from heading import Heading
+from rotation import Rotation
+
+class MouseHost:
+    # Requests start with their type. A new game sends the game ID, maze
+    # dimension, initial x, y and heading index, verbose flag and the length
+    # of the random state that follows it, as JSON. A step sends the game ID,
+    # step number and sensor readings. An end sends the game ID.
+    NEW, STEP, END = 1, 2, 3
+    REQUEST_TYPE = struct.Struct('<B')
+    NEW_GAME = struct.Struct('<IIIIBBI')
+    STEP_GAME = struct.Struct('<II3I')
+    END_GAME = struct.Struct('<I')
+
+    # Replies hold the game ID, step number, rotation in quarter turns, move
+    # and flags. Rotations and moves that aren't numbers are NOT_A_NUMBER. The
+    # host replies with a step number of READY once it's started, and once
+    # each new game's mouse is built, so neither counts against the budget.
+    REPLY = struct.Struct('<IIbbB')
+    READY = 2 ** 32 - 1
+    NOT_A_NUMBER = -128
+    RESET = 1
+    ERROR = 2
+
+    # The most time in seconds the host can take to start, or to build a new
+    # game's mouse.
+    START_TIMEOUT = 10
+
+    def __init__(self, mouse_name, budget=None):
+        """Runs a mouse class in a separate process.
+
+        Any number of games can be played at once, each with its own mouse in
+        the host process. Steps from different games can be sent before any
+        replies arrive, and are answered in order.
+
+        Arguments:
+            mouse_name -- the name of a mouse class in 'mice'.
+            budget -- the most time in ms a step can take, or None for no
+                limit. Each step's time starts once the step before it in
+                the host has been answered. A step that takes longer is lost,
+                as if the mouse had made an invalid move, and the host is
+                killed and started again, so it can't hold up the steps after
+                it. The host's other games are replayed into the new host, so
+                only the late step is lost.
+        """
+        self.mouse_name = mouse_name
+        self.budget = budget
+        self.log = log.get_logger(f"mouse.{mouse_name}")
+        self.write_lock = threading.Lock()
+        self.condition = threading.Condition()
+        self.next_game = 0
+        self.games = set()
+
+        # The requests sent for each live game, in order, to replay them if
+        # the host is restarted. Each is keyed by the reply it gets.
+        self.history = []
+        self.start()
+
+        # Mice built from this class are played in the host.
+        self.mouse_class = type(mouse_name, (RemoteMouse,), { 'host': self })
+
+    def start(self):
+        """Starts the host process, running this module.
+
+        The host keeps the caller's working directory and finds modules on
+        the caller's path, so mice are found as they would be in-process.
+        """
+        path = [os.path.abspath(p) for p in sys.path] + os.environ.get('PYTHONPATH', '').split(os.pathsep)
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), mice.absolute(self.mouse_name)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            env=dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in path if p))
+        )
+
+        # Replies are collected by a reader thread, so a slow step can be
+        # abandoned without blocking the next one.
+        with self.condition:
+            self.replies = dict()
+            self.closed = False
+        threading.Thread(target=self.read_replies, args=(self.process,), daemon=True).start()
+
+        # Wait for the host to start.
+        if self.wait_replies([(self.READY, self.READY)], time.monotonic() + self.START_TIMEOUT)[0] is None:
+            self.kill()
+            raise Exception(f"Mouse host for '{self.mouse_name}' failed to start.")
+
+    def restart(self, lost):
+        """Kills the host, which may be stuck in a step, and starts a new one.
+
+        The live games' requests are replayed into the new host, so their
+        mice are back where they were. Mice that draw from their own 'rng'
+        replay exactly.
+
+        Arguments:
+            lost -- the keys of requests that aren't replayed.
+        Returns:
+            True if the replay finished in time, else False, leaving the new
+            host without the games.
+        """
+        self.kill()
+        self.start()
+
+        # Replay the live games, ignoring the replies.
+        history = [(k, data) for k, data in self.history if k not in lost]
+        keys = [k for k, _ in history]
+        steps = sum(1 for _, step in keys if step != self.READY)
+        timeout = self.START_TIMEOUT + (0 if self.budget is None else steps * self.budget / 1000)
+        self.write(b''.join(data for _, data in history))
+        if any(reply is None for reply in self.wait_replies(keys, time.monotonic() + timeout)):
+            self.kill()
+            self.start()
+            return False
+
+        self.history = history
+        return True
+
+    def lose_games(self):
+        """Gives up on every game in the host, after a restart that couldn't replay them.
+        """
+        self.log.warning("Mouse host took too long to replay, games %s lost.", sorted(self.games))
+        self.games.clear()
+        self.history = []
+
+    def kill(self):
+        """Kills the host.
+        """
+        with self.condition:
+            self.closed = True
+        self.process.kill()
+        self.process.wait()
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+
+    def new_game(self, maze_dim, init_state, verbose, rng=None):
+        """Starts a game in the host.
+
+        The host's numpy and Python global generators start from the same
+        state as this process's, and the mouse's 'rng' from the same state
+        as the Generator given, so the hosted mouse draws exactly what it
+        would in-process.
+
+        Arguments:
+            maze_dim -- the dimension of the maze.
+            init_state -- the mouse's starting state.
+            verbose -- passed to the mouse.
+            rng -- the mouse's numpy Generator, or None to leave the mouse's own.
+        Returns:
+            the game ID.
+        """
+        np_state = np.random.get_state()
+        version, internal, gauss = random.getstate()
+        state = json.dumps({
+            'rng': None if rng is None else rng.bit_generator.state,
+            'np_random': [np_state[0], np_state[1].tolist(), *np_state[2:]],
+            'random': [version, internal, gauss]
+        }).encode()
+
+        game = self.next_game
+        self.next_game += 1
+        self.games.add(game)
+        self.send((game, self.READY), self.NEW, self.NEW_GAME.pack(
+            game,
+            maze_dim,
+            int(init_state['pos'][0]),
+            int(init_state['pos'][1]),
+            int(init_state['heading'].value // 90),
+            int(bool(verbose)),
+            len(state)
+        ) + state)
+
+        # Building the mouse doesn't count against the budget, but it can't take forever.
+        if self.wait_replies([(game, self.READY)], time.monotonic() + self.START_TIMEOUT)[0] is None:
+            self.games.discard(game)
+            if not self.restart({ (game, self.READY) }):
+                self.lose_games()
+            raise Exception(f"Mouse host for '{self.mouse_name}' took longer than {self.START_TIMEOUT} s to start a game.")
+
+        return game
+
+    def end_game(self, game):
+        """Ends a game in the host, freeing its mouse.
+
+        Arguments:
+            game -- the game ID.
+        """
+        if not self.closed and game in self.games:
+            self.games.discard(game)
+            self.history = [(k, data) for k, data in self.history if k[0] != game]
+            self.send(None, self.END, self.END_GAME.pack(game))
+
+    def play_steps(self, games, steps, readings):
+        """Sends steps to the host, and waits for the moves.
+
+        Every step is sent before any replies are read. If a step is late,
+        its move is lost and the host is restarted. The late step is replayed
+        without a budget, so the mouse moves on as it would after an invalid
+        move. If it still doesn't finish, its game is lost instead. The steps
+        queued behind it are then sent again, each with its own budget.
+
+        Arguments:
+            games -- the game IDs.
+            steps -- the step number of each game.
+            readings -- the sensor readings of each game.
+        Returns:
+            a list of (rot, move) tuples, as returned by 'next_move'. Steps
+            that weren't answered in time, and steps of lost games, are
+            (None, None).
+        """
+        moves = dict()
+        pending = [(g, s, r) for g, s, r in zip(games, steps, readings) if g in self.games]
+        while pending:
+            messages = []
+            for g, s, r in pending:
+                messages.append(self.REQUEST_TYPE.pack(self.STEP) + self.STEP_GAME.pack(g, s, *r))
+                self.history.append(((g, s), messages[-1]))
+            start = time.monotonic()
+            self.write(b''.join(messages))
+
+            # Each step's budget starts once the step before it is answered.
+            late = None
+            for i, (g, s, _) in enumerate(pending):
+                reply = self.wait_replies([(g, s)], None if self.budget is None else start + self.budget / 1000)[0]
+                if reply is None:
+                    late = i
+                    break
+                moves[(g, s)], start = reply
+            if late is None:
+                break
+
+            # Forfeit the late step, and send the steps behind it again.
+            game, step, _ = pending[late]
+            if self.closed:
+                self.log.warning("Mouse host stopped in game %d step %d, step lost.", game, step)
+            else:
+                self.log.warning("Game %d step %d took longer than %s ms, step lost.", game, step, self.budget)
+            queued = { (g, s) for g, s, _ in pending[late + 1:] }
+            if not self.restart(queued):
+                self.log.warning("Game %d step %d didn't finish, game lost.", game, step)
+                self.games.discard(game)
+                if not self.restart(queued | { k for k, _ in self.history if k[0] == game }):
+                    self.lose_games()
+            pending = [(g, s, r) for g, s, r in pending[late + 1:] if g in self.games]
+
+        return [moves.get(k, (None, None)) for k in zip(games, steps)]
+
+    def wait_replies(self, keys, deadline):
+        """Waits for replies from the host.
+
+        Arguments:
+            keys -- the (game, step) of each reply.
+            deadline -- the time.monotonic() to give up at, or None to wait forever.
+        Returns:
+            a list of (reply, time.monotonic() it arrived) tuples, None for
+            any that didn't arrive in time.
+        """
+        with self.condition:
+            timeout = None if deadline is None else max(0, deadline - time.monotonic())
+            self.condition.wait_for(lambda: self.closed or all(k in self.replies for k in keys), timeout)
+
+            return [self.replies.pop(k, None) for k in keys]
+
+    def send(self, key, request, body):
+        """Sends a request to the host, keeping it to replay if it's for a live game.
+
+        Arguments:
+            key -- the (game, step) of the reply, or None if there isn't one.
+            request -- the request type.
+            body -- the packed request.
+        """
+        data = self.REQUEST_TYPE.pack(request) + body
+        if key is not None:
+            self.history.append((key, data))
+        self.write(data)
+
+    def write(self, data):
+        """Writes to the host's input.
+        """
+        with self.write_lock:
+            try:
+                self.process.stdin.write(data)
+                self.process.stdin.flush()
+            except BrokenPipeError:
+                self.log.error("Mouse host has stopped.")
+
+    def read_replies(self, process):
+        """Collects replies from a host process until it stops.
+
+        Arguments:
+            process -- the host's Popen. Once it's been replaced, its replies are ignored.
+        """
+        while True:
+            data = process.stdout.read(self.REPLY.size)
+            if len(data) < self.REPLY.size:
+                break
+            game, step, rot, move, flags = self.REPLY.unpack(data)
+
+            # Decode the move.
+            if flags & self.RESET:
+                result = ('RESET', 'RESET')
+            elif flags & self.ERROR or rot == self.NOT_A_NUMBER or move == self.NOT_A_NUMBER:
+                result = (None, None)
+            else:
+                result = (Rotation(rot * 90), move)
+
+            with self.condition:
+                if process is self.process:
+                    self.replies[(game, step)] = (result, time.monotonic())
+                    self.condition.notify_all()
+
+        process.stdout.close()
+        with self.condition:
+            if process is self.process:
+                self.closed = True
+                self.condition.notify_all()
+
+    def close(self):
+        """Stops the host, killing it if it doesn't stop within a second,
+        e.g. because it's stuck in a step.
+        """
+        with self.condition:
+            self.closed = True
+        try:
+            self.process.stdin.close()
+            self.process.wait(1)
+        except (BrokenPipeError, subprocess.TimeoutExpired):
+            self.kill()
+
+# Hosts shared by everything in a process, one per mouse and budget. They're
+# keyed by process too, as a forked process can't use its parent's hosts.
+hosts = dict()
+
+def get_host(mouse_name, budget=None):
+    """Gets the shared host for a mouse, starting it if needed.
+
+    Arguments:
+        mouse_name -- the name of a mouse class in 'mice'.
+        budget -- the most time in ms a step can take, or None for no limit.
+    Returns:
+        the MouseHost.
+    """
+    key = (os.getpid(), mouse_name, budget)
+    if key not in hosts:
+        hosts[key] = MouseHost(mouse_name, budget)
+
+    return hosts[key]
+
+def close_hosts():
+    """Stops this process's hosts when it exits, so none are left running.
+    """
+    for (pid, _, _), host in hosts.items():
+        if pid == os.getpid():
+            host.close()
+
+atexit.register(close_hosts)
+
+class RemoteMouse:
+    # Set on the subclass made by each MouseHost.
+    host = None
+
+    def __init__(self, maze_dim, init_state, verbose):
+        """A mouse that's played in a MouseHost.
+
+        Its hosted mice draw the same random streams it's given: 'rng',
+        numpy's global generator unless the controller gives it a Generator
+        for the run, or each game's Generator in 'rngs' in lockstep. So a
+        seeded run gives the same results isolated or not.
+
+        Arguments:
+            maze_dim -- the dimension of the maze.
+            init_state -- the mouse's starting state.
+            verbose -- passed to the hosted mouse.
+        """
+        self.maze_dim = maze_dim
+        self.init_state = init_state
+        self.verbose = verbose
+        self.rng = np.random
+        self.rngs = None
+        self.games = []
+        self.steps = 0
+
+    def start_games(self, n):
+        """Starts n games in the host, ending them when this mouse is freed.
+        """
+        # Games without a stream of their own draw from 'rng', each from a
+        # new stream if there's more than one.
+        rngs = self.rngs
+        if rngs is None and not isinstance(self.rng, np.random.Generator):
+            rngs = [None] * n
+        elif rngs is None:
+            rngs = [self.rng] if n == 1 else [np.random.default_rng(s) for s in self.rng.integers(2 ** 63, size=n)]
+        for rng in rngs:
+            game = self.host.new_game(self.maze_dim, self.init_state, self.verbose, rng)
+            weakref.finalize(self, self.host.end_game, game)
+            self.games.append(game)
+
+    def next_move(self, readings):
+        """Asks the hosted mouse for its next move.
+
+        Arguments:
+            readings -- a tuple of left, front and right sensor readings.
+        Returns:
+            the hosted mouse's rotation and move, or (None, None) if it took
+            longer than the budget.
+        """
+        return self.next_steps([readings])[0]
+
+    def next_moves(self, readings):
+        """Asks a hosted mouse in each game for its next move, all at once.
+
+        Arguments:
+            readings -- an (n, 3) numpy array of left, front and right sensor readings.
+        Returns:
+            (n,) numpy arrays of rotations in degrees, moves and resets. Lost
+            steps have a rotation of 1, which is never valid.
+        """
+        moves = self.next_steps(readings.tolist())
+        rots = np.array([rot.value if isinstance(rot, Rotation) else 1 for rot, _ in moves], dtype=np.int64)
+        resets = np.array([rot == 'RESET' for rot, _ in moves], dtype=bool)
+        moves = np.array([move if isinstance(move, int) else 0 for _, move in moves], dtype=np.int64)
+
+        return rots, moves, resets
+
+    def next_steps(self, readings):
+        """Sends a step to every game, and waits for the moves.
+        """
+        if not self.games:
+            self.start_games(len(readings))
+
+        steps = [self.steps] * len(self.games)
+        self.steps += 1
+
+        return self.host.play_steps(self.games, steps, readings)
+
+def serve(mouse_name):
+    """Plays games for the controller, reading requests from stdin and
+    writing replies to stdout.
+
+    Arguments:
+        mouse_name -- the name of a mouse class in 'mice'.
+    """
+    mouse_class = mice.get_mouse(mouse_name)
+
+    # Keep stdout for replies, sending anything the mice print to stderr.
+    f_in = os.fdopen(os.dup(0), 'rb')
+    f_out = os.fdopen(os.dup(1), 'wb')
+    os.dup2(2, 1)
+
+    games = dict()
+    try:
+        f_out.write(MouseHost.REPLY.pack(MouseHost.READY, MouseHost.READY, 0, 0, 0))
+        f_out.flush()
+        while True:
+            header = f_in.read(MouseHost.REQUEST_TYPE.size)
+            if not header:
+                break
+            request, = MouseHost.REQUEST_TYPE.unpack(header)
+
+            if request == MouseHost.NEW:
+                game, dim, x, y, heading, verbose, length = MouseHost.NEW_GAME.unpack(f_in.read(MouseHost.NEW_GAME.size))
+                state = json.loads(f_in.read(length))
+
+                # Start from the controller's random state.
+                name, keys, *rest = state['np_random']
+                np.random.set_state((name, np.array(keys, dtype=np.uint32), *rest))
+                version, internal, gauss = state['random']
+                random.setstate((version, tuple(internal), gauss))
+                games[game] = mouse_class(dim, { 'pos': np.array([x, y]), 'heading': Heading(heading * 90) }, bool(verbose))
+                if state['rng'] is not None:
+                    bit_generator = getattr(np.random, state['rng']['bit_generator'])()
+                    bit_generator.state = state['rng']
+                    games[game].rng = np.random.Generator(bit_generator)
+                f_out.write(MouseHost.REPLY.pack(game, MouseHost.READY, 0, 0, 0))
+            elif request == MouseHost.END:
+                game, = MouseHost.END_GAME.unpack(f_in.read(MouseHost.END_GAME.size))
+                games.pop(game, None)
+            elif request == MouseHost.STEP:
+                game, step, *readings = MouseHost.STEP_GAME.unpack(f_in.read(MouseHost.STEP_GAME.size))
+
+                # Encode the move, reporting mice that fail as errors.
+                rot, move, flags = MouseHost.NOT_A_NUMBER, MouseHost.NOT_A_NUMBER, 0
+                try:
+                    mouse_rot, mouse_move = games[game].next_move(tuple(readings))
+                    if (mouse_rot, mouse_move) == ('RESET', 'RESET'):
+                        flags = MouseHost.RESET
+                    else:
+                        if isinstance(mouse_rot, Rotation):
+                            rot = mouse_rot.value // 90
+                        if isinstance(mouse_move, (int, float, np.number)) and mouse_move % 1 == 0 and -128 < mouse_move < 128:
+                            move = int(mouse_move)
+                except Exception as e:
+                    log.get_logger(f"mouse.{mouse_name}").error("Game %d step %d failed: %s", game, step, e)
+                    flags = MouseHost.ERROR
+                f_out.write(MouseHost.REPLY.pack(game, step, rot, move, flags))
+            else:
+                raise Exception(f"Unknown request type {request}.")
+            f_out.flush()
+    except BrokenPipeError:
+        # The controller has gone.
+        pass
+
+if __name__ == '__main__':
+    serve(sys.argv[1])
@@ -0,0 +1,132 @@
+import os
+import sys
+import cProfile
+import pstats
+
+class SubsystemProfiler:
+    # Source files in each subsystem, besides the mouse's own module.
+    SUBSYSTEMS = (
+        ('controller', ('controller.py',)),
+        ('maze', ('maze.py',)),
+        ('graph', ('graph.py',)),
+        ('heading/sensor/state', ('heading.py', 'sensor.py', 'state.py')),
+        ('display', ('display.py',)),
+        ('solver', ('solver.py',)),
+        ('traces', ('traces.py',)),
+        ('stats', ('stats.py',))
+    )
+
+    # Time that can't be traced back to a subsystem.
+    OTHER = 'other'
+
+    def __init__(self, mouse_module=None):
+        """Profiles a session and breaks the time down by subsystem.
+
+        Each function's own time is charged to the subsystem whose file it's
+        in. Time spent outside the repo, e.g. in enum, numpy or turtle, is
+        charged to the subsystems that called it, in proportion to the time
+        each caller spent on it. So a Heading lookup's enum overhead counts
+        towards heading/sensor/state rather than a long tail of library
+        functions.
+
+        Arguments:
+            mouse_module -- the name of the mouse class's module, e.g.
+                'mice.a_star_mouse', given its own subsystem. It can also be
+                set with 'set_mouse_module' once the mouse is found.
+        """
+        self.files = { f: name for name, files in self.SUBSYSTEMS for f in files }
+        self.root = os.path.dirname(os.path.abspath(__file__))
+        self.profile = cProfile.Profile()
+        self.set_mouse_module(mouse_module)
+
+    def set_mouse_module(self, mouse_module):
+        """Gives the mouse's module its own subsystem.
+
+        Arguments:
+            mouse_module -- the name of the mouse class's module, or None.
+        """
+        self.mouse_file = None
+        self.mouse_name = None
+        if mouse_module is not None and getattr(sys.modules.get(mouse_module), '__file__', None):
+            self.mouse_file = os.path.abspath(sys.modules[mouse_module].__file__)
+            self.mouse_name = f"mouse ({mouse_module.rpartition('.')[2]})"
+
+    def start(self):
+        """Starts profiling.
+        """
+        self.profile.enable()
+
+    def stop(self):
+        """Stops profiling.
+        """
+        self.profile.disable()
+
+    def dump(self, filename):
+        """Writes the full profile, for viewers such as snakeviz or 'python -m pstats'.
+
+        Arguments:
+            filename -- the path to the output file.
+        """
+        self.profile.dump_stats(filename)
+
+    def subsystem(self, func):
+        """Finds the subsystem a function belongs to.
+
+        Arguments:
+            func -- a pstats (filename, line, name) key.
+        Returns:
+            the subsystem's name, or None if the function is outside the repo.
+        """
+        # Built-in functions have no file, e.g. '~'.
+        filename = func[0]
+        if not filename.endswith('.py'):
+            return None
+        if self.mouse_file is not None and os.path.abspath(filename) == self.mouse_file:
+            return self.mouse_name
+        if os.path.dirname(os.path.abspath(filename)) == self.root:
+            return self.files.get(os.path.basename(filename), self.OTHER)
+
+        return None
+
+    def summary(self):
+        """Breaks the profiled time down by subsystem.
+
+        Returns:
+            a list of dicts with the 'subsystem', its 'seconds' and its
+            'percent' of the total, largest first.
+        """
+        stats = pstats.Stats(self.profile).stats
+        shares = dict()
+
+        def find_shares(func, visiting):
+            # Find the fraction of a function's time charged to each
+            # subsystem. Functions in the repo are charged directly, and
+            # anything else is shared between its callers.
+            name = self.subsystem(func)
+            if name is not None:
+                return { name: 1 }
+            if func in shares:
+                return shares[func]
+            callers = stats[func][4] if func in stats else dict()
+            if not callers or func in visiting:
+                return { self.OTHER: 1 }
+
+            result = dict()
+            caller_time = sum(c[2] for c in callers.values())
+            for caller, c in callers.items():
+                share = c[2] / caller_time if caller_time > 0 else 1 / len(callers)
+                for name, fraction in find_shares(caller, visiting | { func }).items():
+                    result[name] = result.get(name, 0) + share * fraction
+            shares[func] = result
+
+            return result
+
+        totals = dict()
+        for func, (_, _, own, _, _) in stats.items():
+            for name, fraction in find_shares(func, frozenset()).items():
+                totals[name] = totals.get(name, 0) + own * fraction
+
+        total = sum(totals.values())
+        rows = [{ 'subsystem': name, 'seconds': seconds, 'percent': 100 * seconds / total if total else 0 } for name, seconds in totals.items()]
+
+        return sorted(rows, key=lambda r: -r['seconds'])
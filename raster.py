@@ -0,0 +1,302 @@
+import numpy as np
+from heading import Heading
+from phase import Phase
+from traces import Trace
+from images import PngWriter, GifWriter
+
+class Raster:
+    # Colours by palette index: the background, walls, paths taken 1 to 6+
+    # times, as in Display.path_colour, and the mouse.
+    PALETTE = np.array([
+        (255, 255, 255),    # white
+        (0, 0, 0),          # black
+        (255, 0, 0),        # red
+        (255, 165, 0),      # orange
+        (255, 255, 0),      # yellow
+        (0, 255, 0),        # green
+        (0, 0, 255),        # blue
+        (238, 130, 238),    # violet
+        (96, 96, 96)        # grey
+    ], dtype=np.uint8)
+    BACKGROUND = 0
+    WALL = 1
+    PATH = 2
+    MOUSE = 8
+
+    # Frames are shown for this long in ms, unless a delay is given.
+    DELAY = 50
+
+    def __init__(self, maze, square_size=16, wall_width=2, path_width=2):
+        """Draws the maze, the mouse's tracks and the mouse into images, without a display.
+
+        It mirrors Display, so it can be driven the same way, and images are
+        numpy arrays of palette indexes. The walls are drawn once, and each
+        move only draws the passages it took.
+
+        Arguments:
+            maze -- the Maze to draw.
+            square_size -- the width of each square in pixels.
+            wall_width -- the width of the walls in pixels.
+            path_width -- the width of the tracks in pixels.
+        """
+        self.maze = maze
+        self.square_size = square_size
+        self.wall_width = wall_width
+        self.path_width = path_width
+        self.size = maze.dim * square_size + wall_width
+
+        # Tracks run through the middle of each square, inside the walls.
+        self.path_offset = wall_width + (square_size - wall_width - path_width) // 2
+
+        # The mouse is a triangle pointing north, inside the walls.
+        inner = square_size - wall_width
+        rows, cols = np.mgrid[0:inner, 0:inner] + 0.5
+        tip, base = 0.2 * inner, 0.8 * inner
+        self.mouse_shape = (rows >= tip) & (rows <= base) & (np.abs(cols - inner / 2) <= 0.35 * inner * (rows - tip) / (base - tip))
+
+        self.draw_maze()
+        self.clear_track()
+        self.place_mouse([0, 0], Heading.NORTH)
+
+    def draw_maze(self):
+        """Draws the maze's walls, all at once.
+        """
+        dim, s, w = self.maze.dim, self.square_size, self.wall_width
+        closed = lambda heading: (self.maze.walls & self.maze.HEADING_DECIMAL_MAP[heading]) == 0
+
+        # Walls along each horizontal line, from the bottom of the maze, and
+        # each vertical line, from the left. Both sides of a wall are checked.
+        horizontal = np.zeros((dim + 1, dim), dtype=bool)
+        horizontal[:dim] |= closed(Heading.SOUTH).T
+        horizontal[1:] |= closed(Heading.NORTH).T
+        vertical = np.zeros((dim + 1, dim), dtype=bool)
+        vertical[:dim] |= closed(Heading.WEST)
+        vertical[1:] |= closed(Heading.EAST)
+
+        # Each wall covers its square's side and the corner after it.
+        self.base = np.full((self.size, self.size), self.BACKGROUND, dtype=np.uint8)
+        lines = (dim - np.arange(dim + 1)) * s
+        cover = Raster.segments(horizontal, s, s + w, 0, self.size)
+        for t in range(w):
+            self.base[lines + t] = np.where(cover, self.WALL, self.base[lines + t])
+
+        # Squares are laid out from the top of the image down.
+        lines = np.arange(dim + 1) * s
+        cover = Raster.segments(vertical[:, ::-1], s, s + w, 0, self.size)
+        for t in range(w):
+            self.base[:, lines + t] = np.where(cover.T, self.WALL, self.base[:, lines + t])
+
+    def segments(values, step, length, offset, size):
+        """Lays out rows of segments, one per square, along lines of pixels.
+
+        Arguments:
+            values -- a (lines, squares) array, 0 where there's no segment.
+            step -- the pixels between the starts of each segment.
+            length -- the length of each segment in pixels.
+            offset -- the pixel each line's first segment starts at.
+            size -- the length of each line in pixels.
+        Returns:
+            a (lines, size) array of the values, the largest where segments overlap.
+        """
+        lines, squares = values.shape
+        cover = np.zeros((lines, size), dtype=values.dtype)
+        for k in range(length):
+            start = offset + k
+            section = cover[:, start:start + squares * step:step]
+            np.maximum(section, values[:, :section.shape[1]], out=section)
+
+        return cover
+
+    def path_colour(n):
+        """Gets the palette index of a path's colour.
+
+        Arguments:
+            n -- the number of times the path has been taken, or an array of them.
+        Returns:
+            the palette index, or BACKGROUND for paths not taken.
+        """
+        return np.where(n > 0, Raster.PATH - 1 + np.minimum(n, 6), Raster.BACKGROUND).astype(np.uint8)
+
+    def draw_track(self, counts):
+        """Draws a track that's already been taken, all at once.
+
+        Arguments:
+            counts -- a (dim, dim, 2) array of the number of times each passage
+                has been taken, as in Trace.add_move.
+        """
+        dim, s, p = self.maze.dim, self.square_size, self.path_width
+        self.paths = np.array(counts, dtype=np.uint32)
+        self.image = self.base.copy()
+
+        # Passages east run from the middle of a square to the middle of the
+        # next. Where passages meet, the one taken most shows.
+        colours = Raster.path_colour(self.paths)
+        rows = (dim - 1 - np.arange(dim)) * s + self.path_offset
+        cover = Raster.segments(colours[:, :, 0].T, s, s + p, self.path_offset, self.size)
+        for t in range(p):
+            self.image[rows + t] = np.maximum(self.image[rows + t], cover)
+
+        # Passages north run up from the middle of a square. The top row of
+        # squares has none, so the segments start from the second row down.
+        cols = np.arange(dim) * s + self.path_offset
+        cover = Raster.segments(colours[:, ::-1, 1][:, 1:], s, s + p, self.path_offset, self.size)
+        for t in range(p):
+            self.image[:, cols + t] = np.maximum(self.image[:, cols + t], cover.T)
+
+    def clear_track(self):
+        """Clears the mouse's tracks.
+        """
+        self.draw_track(np.zeros((self.maze.dim, self.maze.dim, 2), dtype=np.uint32))
+
+    def place_mouse(self, pos, heading):
+        """Places the mouse in the maze.
+
+        Arguments:
+            pos -- the mouse's [x, y] position.
+            heading -- a Heading value, e.g. Heading.NORTH.
+        """
+        self.pos = np.array(pos, dtype=np.int64)
+        self.heading = heading
+
+    def set_heading(self, heading):
+        """Turns the mouse.
+
+        Arguments:
+            heading -- a Heading value, e.g. Heading.NORTH.
+        """
+        self.heading = heading
+
+    def move(self, pos):
+        """Draws a mouse's move, colouring each passage by how many times it's been taken.
+
+        Arguments:
+            pos -- the mouse's new [x, y] position.
+        """
+        old_pos = self.pos
+        self.pos = np.array(pos, dtype=np.int64)
+        Trace.add_move(self.paths, old_pos, self.pos)
+
+        # Draw each passage along the move.
+        diff = self.pos - old_pos
+        n_squares = int(np.abs(diff).sum())
+        if n_squares == 0:
+            return
+        step = diff // n_squares
+        for i in range(n_squares):
+            x, y = np.minimum(old_pos + i * step, old_pos + (i + 1) * step)
+            side = 0 if step[0] != 0 else 1
+            self.draw_passage(x, y, side, Raster.path_colour(self.paths[x, y, side]))
+
+    def draw_passage(self, x, y, side, colour):
+        """Draws the passage east or north of a square.
+
+        Arguments:
+            x, y -- the square's position.
+            side -- 0 for the passage east, 1 for the passage north.
+            colour -- the palette index to draw it in.
+        """
+        s, p = self.square_size, self.path_width
+        left = x * s + self.path_offset
+        bottom = (self.maze.dim - 1 - y) * s + self.path_offset + p
+        if side == 0:
+            section = self.image[bottom - p:bottom, left:left + s + p]
+        else:
+            section = self.image[bottom - p - s:bottom, left:left + p]
+
+        # Where passages meet, the one taken most shows, as in 'draw_track'.
+        np.maximum(section, colour, out=section)
+
+    def frame(self):
+        """Draws the maze, tracks and mouse.
+
+        Returns:
+            a (height, width) uint8 array of palette indexes.
+        """
+        frame = self.image.copy()
+        inner = self.square_size - self.wall_width
+        top = (self.maze.dim - 1 - self.pos[1]) * self.square_size + self.wall_width
+        left = self.pos[0] * self.square_size + self.wall_width
+
+        # Headings are quarter turns clockwise from north.
+        shape = np.rot90(self.mouse_shape, -(self.heading.value // 90))
+        square = frame[top:top + inner, left:left + inner]
+        square[shape] = self.MOUSE
+
+        return frame
+
+    def image_rgb(self):
+        """Draws the maze, tracks and mouse.
+
+        Returns:
+            a (height, width, 3) uint8 array of RGB pixels.
+        """
+        return self.PALETTE[self.frame()]
+
+    def show(self, trace, index):
+        """Draws the state of a recorded game before a record.
+
+        Arguments:
+            trace -- the Trace.
+            index -- the index of the record, or the number of records for
+                the state after the last.
+        """
+        if len(trace) == 0:
+            self.clear_track()
+            self.place_mouse(trace.init_pos, trace.init_heading)
+            return
+
+        # Play the last record on top of the state before it.
+        last = index == len(trace)
+        pos, heading, counts = trace.state(index - 1 if last else index)
+        self.draw_track(counts)
+        self.place_mouse(pos, heading)
+        if last:
+            record = trace.records[index - 1]
+            self.set_heading(Heading(int(record['heading']) * 90))
+            self.move(record['pos'].astype(np.int64))
+
+    def render(self, trace, filename, start=None, every=1, delay=DELAY):
+        """Renders a recorded game to a PNG snapshot or an animated GIF.
+
+        Arguments:
+            trace -- the Trace to render.
+            filename -- the path to the image, ending in '.png' or '.gif'.
+            start -- the record to show in a PNG, or to start a GIF from.
+                PNGs show the end of the game if not given.
+            every -- adds a GIF frame every n records.
+            delay -- the time each GIF frame is shown for in ms.
+        """
+        if trace.maze_hash != self.maze.content_hash:
+            raise Exception("Trace wasn't recorded on this maze!")
+        extension = filename.rpartition('.')[2].lower()
+        if extension not in ('png', 'gif'):
+            raise Exception(f"Can't render '{filename}', use a '.png' or '.gif' file.")
+
+        # Snapshot one state.
+        if extension == 'png':
+            self.show(trace, len(trace) if start is None else start)
+            PngWriter.write(filename, self.image_rgb())
+            return
+
+        # Play the records, as in Replay, drawing every nth.
+        start = start or 0
+        writer = GifWriter(filename, self.PALETTE, delay)
+        self.show(trace, start)
+        writer.add_frame(self.frame())
+        phase = Phase(int(trace.records['phase'][start])) if start < len(trace) else None
+        for i in range(start, len(trace)):
+            record = trace.records[i]
+
+            # The track is cleared when the execution run starts.
+            if Phase(int(record['phase'])) != phase:
+                phase = Phase(int(record['phase']))
+                self.clear_track()
+                self.place_mouse(trace.init_pos, trace.init_heading)
+
+            self.set_heading(Heading(int(record['heading']) * 90))
+            pos = record['pos'].astype(np.int64)
+            if not np.array_equal(pos, self.pos):
+                self.move(pos)
+            if (i + 1 - start) % every == 0 or i == len(trace) - 1:
+                writer.add_frame(self.frame())
+        writer.close()
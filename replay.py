@@ -0,0 +1,63 @@
+import numpy as np
+from heading import Heading
+from phase import Phase
+
+class Replay:
+    def __init__(self, trace, display, delay=0):
+        """Plays a recorded trace on a display, without the mouse.
+
+        Arguments:
+            trace -- the Trace to play.
+            display -- the Display to write to.
+            delay -- the delay in ms between steps.
+        """
+        if trace.maze_hash != display.maze.content_hash:
+            raise Exception("Trace wasn't recorded on this maze!")
+
+        self.trace = trace
+        self.display = display
+        self.delay = delay
+
+    def run(self, start=0):
+        """Plays the trace until the end.
+
+        Arguments:
+            start -- the index of the record to start from.
+        """
+        # Set up the display at the start record.
+        pos, heading, counts = self.trace.state(start)
+        self.display.draw_maze()
+        self.display.draw_track(counts)
+        self.display.place_mouse(pos, heading)
+
+        # Start playing.
+        self.index = start
+        self.phase = Phase(int(self.trace.records['phase'][start]))
+        self.display.sleep(self.run_display_step, self.delay)
+        self.display.screen.listen()
+        self.display.mainloop()
+
+    def run_display_step(self):
+        """Plays one record.
+        """
+        if self.index >= len(self.trace):
+            self.display.close()
+            return
+
+        record = self.trace.records[self.index]
+        self.index += 1
+
+        # The track is cleared when the execution run starts.
+        phase = Phase(int(record['phase']))
+        if phase != self.phase:
+            self.phase = phase
+            self.display.clear_track()
+            self.display.place_mouse(self.trace.init_pos, self.trace.init_heading)
+
+        # Update the display.
+        self.display.set_heading(Heading(int(record['heading']) * 90))
+        pos = record['pos'].astype(np.int64)
+        if not np.array_equal(pos, self.display.pos):
+            self.display.move(pos)
+
+        self.display.sleep(self.run_display_step, self.delay)
@@ -0,0 +1,153 @@
+import os
+import random
+import numpy as np
+import mice
+from maze import Maze
+from controller import Controller
+from phase import Phase
+
+class Runner:
+    def __init__(self, maze, mouse_name, init_state, max_steps=1000, delay=0, pause=False, verbose=False, track_regret=False, track_latency=False, isolate=False, budget=None, fps=None):
+        """Plays headless runs of a mouse through a maze, each with its own seed.
+
+        Seeding every run separately means a run's result depends only on its
+        seed, not on which process plays it or what was played before.
+
+        Arguments:
+            maze -- the Maze, or the path to a maze file.
+            mouse_name -- a mouse, as for 'mice.get_mouse'.
+            init_state -- the mouse's starting state.
+            max_steps -- the maximum number of steps per phase.
+            delay -- the delay in ms between steps.
+            pause -- should we pause before runs.
+            verbose -- prints info to the command line.
+            track_regret -- records how many steps each move wasted.
+            track_latency -- times each step's operations.
+            isolate -- plays the mouse in a separate process.
+            budget -- the most time in ms an isolated mouse's step can take.
+            fps -- redraw the display this many times a second, running the
+                steps at full speed between frames.
+        """
+        self.maze = maze if isinstance(maze, Maze) else Maze(maze)
+
+        # Modules only some runs need are imported when they're used, so
+        # headless runs start quickly.
+        if isolate:
+            from mouse_host import get_host
+            mouse_class = get_host(mouse_name, budget).mouse_class
+        else:
+            mouse_class = mice.get_mouse(mouse_name)
+        self.controller = Controller(
+            mouse_class,
+            self.maze,
+            init_state,
+            max_steps=max_steps,
+            delay=delay,
+            pause=pause,
+            verbose=verbose,
+            track_regret=track_regret,
+            fps=fps
+        )
+        self.track_latency = track_latency
+
+    def child_seeds(seed, n):
+        """Derives independent seeds for each run from a master seed.
+
+        Arguments:
+            seed -- the master seed, or None to draw one from the OS.
+        Returns:
+            a list of n integer seeds.
+        """
+        return [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(seed).spawn(n)]
+
+    def run(self, seed, display=None, trace=None, render=None, render_every=1):
+        """Plays one seeded run.
+
+        The mouse is given its own numpy Generator, seeded from the run's
+        seed, so mice played with the same seeds see the same random streams
+        and their runs can be compared in pairs. Mice that still draw from
+        numpy's or Python's global random generators get those seeded too.
+
+        Arguments:
+            seed -- the seed for the run.
+            display -- a Display to show the run on, if any.
+            trace -- the path to record a replay trace of the run to, if any.
+            render -- the path to render the run to, if any, as a PNG of its
+                end or an animated GIF of every step.
+            render_every -- adds a GIF frame every n steps.
+        Returns:
+            a dict with the run's 'score' and 'execution_steps' (both None if
+            the mouse failed) and, if tracking regret, the 'plan_regret',
+            'execution_regret' and 'wasted_moves' of the execution phase and, if
+            tracking latency, the run's 'latency' LatencyProfiler.
+        """
+        np.random.seed(seed)
+        random.seed(seed)
+
+        controller = self.controller
+        controller.rng = np.random.default_rng(seed)
+        controller.latency = None
+        if self.track_latency:
+            from latency import LatencyProfiler
+            controller.latency = LatencyProfiler()
+
+        # Renders are drawn from a trace, so record one if it isn't kept.
+        trace_path = trace
+        if render and not trace:
+            import tempfile
+            fd, trace_path = tempfile.mkstemp(suffix='.trace')
+            os.close(fd)
+        if trace_path:
+            from traces import Trace, TraceWriter
+            controller.trace = TraceWriter(trace_path, self.maze, controller.init_state)
+        if display:
+            controller.run_with_display(display)
+        else:
+            controller.run_normal()
+        if trace_path:
+            controller.trace.close()
+            controller.trace = None
+        if render:
+            from raster import Raster
+            Raster(self.maze).render(Trace(trace_path), render, every=render_every, delay=controller.delay or Raster.DELAY)
+            if not trace:
+                os.remove(trace_path)
+
+        # Execution steps are left over from the last run if the mouse never executed.
+        score = controller.score()
+        result = {
+            'score': score,
+            'execution_steps': int(controller.steps[Phase.EXECUTE.value]) + 1 if score else None
+        }
+
+        if controller.track_regret:
+            result['plan_regret'] = controller.total_regret(Phase.PLAN)
+            result['execution_regret'] = controller.total_regret(Phase.EXECUTE)
+            result['wasted_moves'] = [r for r in controller.regrets[Phase.EXECUTE] if r['regret'] > 0]
+
+        if self.track_latency:
+            result['latency'] = controller.latency
+
+        return result
+
+# Each worker process keeps one Runner, so the maze is only loaded once.
+worker_runner = None
+
+def init_worker(*args):
+    """Creates the worker process's Runner. Used as a process pool initializer.
+
+    Arguments:
+        args -- the Runner's arguments.
+    """
+    global worker_runner
+    worker_runner = Runner(*args)
+
+def run_worker(seed):
+    """Plays one seeded run in a worker process.
+
+    Arguments:
+        seed -- the seed for the run.
+    Returns:
+        the run's result dict.
+    """
+    return worker_runner.run(seed)
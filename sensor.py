@@ -1,4 +1,3 @@
-import pdb
 from enum import Enum
 import numpy as np
 from rotation import Rotation
@@ -0,0 +1,168 @@
+import numpy as np
+from heading import Heading
+from rotation import Rotation
+
+class Solver:
+    MAX_MOVE = 3
+
+    # Rotations as offsets along the heading index.
+    ROTATION_OFFSET_MAP = {
+        Rotation.LEFT: -1,
+        Rotation.NONE: 0,
+        Rotation.RIGHT: 1
+    }
+
+    def __init__(self, maze):
+        """Creates an omniscient solver for a maze.
+
+        The solver plays by the same rules as the controller. Each step is a
+        rotation followed by a move of up to MAX_MOVE squares forwards or
+        backwards, and moves can't pass through walls.
+
+        Arguments:
+            maze -- the Maze to solve.
+        """
+        self.maze = maze
+        self.dim = maze.dim
+
+        # Axial components of each heading, in heading index order.
+        self.dx = np.zeros(4, dtype=np.int64)
+        self.dy = np.zeros(4, dtype=np.int64)
+        for heading, idx in maze.HEADING_INDEX_MAP.items():
+            self.dx[idx], self.dy[idx] = heading.components()
+
+        # Every (rotation, move) pair the mouse could make.
+        self.actions = [(rot, move) for rot in Rotation for move in range(-self.MAX_MOVE, self.MAX_MOVE + 1)]
+
+    def solve(self, pos=(0, 0), heading=Heading.NORTH):
+        """Finds the fewest steps to reach the goal.
+
+        Runs a breadth-first search over (square, heading) states, expanding
+        the whole frontier at once with array operations.
+
+        Arguments:
+            pos -- the starting [x, y] position.
+            heading -- the starting Heading.
+        Returns:
+            the minimum number of steps and a list of (Rotation, move) tuples
+            that achieves it, or (None, None) if the goal can't be reached.
+        """
+        dim = self.dim
+        distances = self.maze.wall_distances.reshape(-1, 4)
+        goal = self.maze.goal_mask.ravel()
+
+        # States are numbered (x * dim + y) * 4 + heading index.
+        start = (int(pos[0]) * dim + int(pos[1])) * 4 + self.maze.HEADING_INDEX_MAP[heading]
+        if goal[start // 4]:
+            return 0, []
+
+        # Record where each state was reached from, and by which action.
+        parents = np.full(dim * dim * 4, -1, dtype=np.int64)
+        actions = np.full(dim * dim * 4, -1, dtype=np.int8)
+        visited = np.zeros(dim * dim * 4, dtype=bool)
+        visited[start] = True
+
+        # Rotation offsets along the heading index, and move sizes, in the same
+        # order as the action list.
+        offsets = np.array([self.ROTATION_OFFSET_MAP[rot] for rot in Rotation])
+        moves = np.arange(-self.MAX_MOVE, self.MAX_MOVE + 1)
+        action_ids = np.arange(len(self.actions)).reshape(len(offsets), len(moves))
+
+        frontier = np.array([start], dtype=np.int64)
+        steps = 0
+        while len(frontier):
+            steps += 1
+
+            # Try every action from every state on the frontier at once. Arrays
+            # are indexed by [state, rotation, move].
+            squares = frontier // 4
+            new_headings = (frontier[:, None] % 4 + offsets) % 4
+
+            # Moves can't be longer than the distance to the wall in the
+            # direction of travel, which is behind us for negative moves.
+            ahead = distances[squares[:, None], new_headings][:, :, None]
+            behind = distances[squares[:, None], (new_headings + 2) % 4][:, :, None]
+            valid = np.where(moves > 0, ahead >= moves, behind >= -moves)
+
+            # Find the state each action leads to.
+            stride = (self.dx[new_headings] * dim + self.dy[new_headings]) * 4
+            new_states = (squares[:, None, None] * 4 + new_headings[:, :, None]) + moves * stride[:, :, None]
+            from_states = np.broadcast_to(frontier[:, None, None], valid.shape)[valid]
+            new_action_ids = np.broadcast_to(action_ids, valid.shape)[valid]
+            new_states = new_states[valid]
+
+            # Keep states we haven't seen before, reached by any one action.
+            unseen = ~visited[new_states]
+            frontier, first = np.unique(new_states[unseen], return_index=True)
+            visited[frontier] = True
+            parents[frontier] = from_states[unseen][first]
+            actions[frontier] = new_action_ids[unseen][first]
+
+            # Stop as soon as any state in the goal is reached.
+            in_goal = goal[frontier // 4]
+            if in_goal.any():
+                return steps, self.__action_path(frontier[in_goal][0], parents, actions)
+
+        # The goal is walled off.
+        return None, None
+
+    def goal_distances(self):
+        """Finds the fewest steps to reach the goal from every state.
+
+        Runs a breadth-first search backwards from the goal. Moves are
+        reversible, so a state's predecessors are found by making every move
+        from it, then undoing any rotation.
+
+        Returns:
+            a (dim, dim, 4) numpy array indexed by [x, y, heading index]. Goal
+            squares are 0, and states that can't reach the goal are -1.
+        """
+        dim = self.dim
+        distances = self.maze.wall_distances.reshape(-1, 4)
+        offsets = np.array([self.ROTATION_OFFSET_MAP[rot] for rot in Rotation])
+        moves = np.arange(-self.MAX_MOVE, self.MAX_MOVE + 1)
+
+        # States are numbered (x * dim + y) * 4 + heading index. Start from
+        # every heading in the goal.
+        goal_distances = np.full(dim * dim * 4, -1, dtype=np.int32)
+        frontier = np.flatnonzero(np.repeat(self.maze.goal_mask.ravel(), 4))
+        goal_distances[frontier] = 0
+
+        steps = 0
+        while len(frontier):
+            steps += 1
+            squares, headings = frontier // 4, frontier % 4
+
+            # Make every move from the frontier, indexed by [state, move].
+            ahead = distances[squares, headings][:, None]
+            behind = distances[squares, (headings + 2) % 4][:, None]
+            valid = np.where(moves > 0, ahead >= moves, behind >= -moves)
+            stride = (self.dx[headings] * dim + self.dy[headings]) * 4
+            moved = (frontier[:, None] + moves * stride[:, None])[valid]
+
+            # Undo the rotation that was made before the move.
+            moved_squares, moved_headings = moved // 4, moved % 4
+            previous = (moved_squares[:, None] * 4 + (moved_headings[:, None] - offsets) % 4).ravel()
+
+            # Keep states we haven't seen before.
+            frontier = np.unique(previous[goal_distances[previous] == -1])
+            goal_distances[frontier] = steps
+
+        return goal_distances.reshape(dim, dim, 4)
+
+    def __action_path(self, state, parents, actions):
+        """Retraces the actions taken to reach a state.
+
+        Arguments:
+            state -- the final state.
+            parents -- the state each state was reached from.
+            actions -- the index of the action that reached each state.
+        Returns:
+            a list of (Rotation, move) tuples, from the start.
+        """
+        path = []
+        while parents[state] != -1:
+            path.append(self.actions[actions[state]])
+            state = parents[state]
+
+        return path[::-1]
@@ -3,8 +3,8 @@ from heading import Heading
 
 class State:
     def __init__(self, pos, heading):
-        # Store the initial state.
-        self.init_pos = np.array(pos, dtype=np.int8)
+        # Store the initial state. Positions are 64-bit so any maze size fits.
+        self.init_pos = np.array(pos, dtype=np.int64)
         self.init_heading = heading
 
         # Reset the state.
@@ -18,3 +18,11 @@ class State:
         self.pos = self.init_pos.copy()
         self.heading = self.init_heading
 
+    def copy(self):
+        """Copies the state.
+        """
+        state = State(self.init_pos, self.init_heading)
+        state.pos = self.pos.copy()
+        state.heading = self.heading
+
+        return state
@@ -0,0 +1,98 @@
+from statistics import NormalDist
+import numpy as np
+
+# Confidence level of the reported intervals.
+CONFIDENCE = 0.95
+
+def z_score(confidence=CONFIDENCE):
+    """Gets the two-sided normal critical value for a confidence level.
+
+    Arguments:
+        confidence -- the confidence level, e.g. 0.95.
+    Returns:
+        the critical value, e.g. 1.96.
+    """
+    return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+def mean_ci(values, confidence=CONFIDENCE):
+    """Estimates a mean and the half-width of its confidence interval.
+
+    Uses the normal approximation, which is close once there are a few dozen
+    values.
+
+    Arguments:
+        values -- the samples.
+        confidence -- the confidence level.
+    Returns:
+        the mean and half-width, or None for either if there are too few values.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return None, None
+    if len(values) == 1:
+        return float(values[0]), None
+
+    return float(values.mean()), z_score(confidence) * float(values.std(ddof=1)) / np.sqrt(len(values))
+
+def proportion_ci(successes, n, confidence=CONFIDENCE):
+    """Estimates a proportion and the half-width of its Wilson score interval.
+
+    Unlike the normal approximation, the interval doesn't collapse to zero
+    width when every trial, or none, succeeds.
+
+    Arguments:
+        successes -- the number of successes.
+        n -- the number of trials.
+        confidence -- the confidence level.
+    Returns:
+        the proportion and half-width, or None for both if there were no trials.
+    """
+    if n == 0:
+        return None, None
+
+    z = z_score(confidence)
+    p = successes / n
+    half_width = z / (1 + z ** 2 / n) * np.sqrt(p * (1 - p) / n + z ** 2 / (4 * n ** 2))
+
+    return p, float(half_width)
+
+def paired_scores(a, b):
+    """Pairs two mice's scores by seed.
+
+    Arguments:
+        a -- a dict of seed to score for the first mouse, None if it failed.
+        b -- a dict of seed to score for the second mouse.
+    Returns:
+        two arrays of a's and b's scores, for the seeds both mice finished.
+    """
+    seeds = sorted(s for s in a if a[s] is not None and b.get(s) is not None)
+
+    return np.array([a[s] for s in seeds], dtype=np.float64), np.array([b[s] for s in seeds], dtype=np.float64)
+
+def target_reached(scores, finished, runs, target, metric='score', min_runs=30, confidence=CONFIDENCE):
+    """Checks if enough runs have been played to stop, for sequential stopping.
+
+    Arguments:
+        scores -- the scores of the finished runs.
+        finished -- the number of runs finished.
+        runs -- the number of runs played.
+        target -- the confidence interval half-width to stop at, in points
+            of score for 'score', or percentage points for 'finish', e.g. 2
+            for a finish rate known to ±2%.
+        metric -- 'score' for the mean score, or 'finish' for the finish rate.
+        min_runs -- the fewest runs to stop after, as the intervals are
+            unreliable with only a few runs.
+        confidence -- the confidence level.
+    Returns:
+        True if the interval is at most the target, else False.
+    """
+    if runs < min_runs:
+        return False
+
+    if metric == 'finish':
+        _, half_width = proportion_ci(finished, runs, confidence)
+        half_width = None if half_width is None else 100 * half_width
+    else:
+        _, half_width = mean_ci(scores, confidence)
+
+    return half_width is not None and half_width <= target
@@ -0,0 +1,277 @@
+import os
+import json
+import multiprocessing
+import numpy as np
+import stats
+from heading import Heading
+from maze import Maze
+from runner import Runner
+
+class Tournament:
+    # Every mouse starts in the same corner, as in robomouse.
+    INIT_STATE = { 'pos': [0, 0], 'heading': Heading.NORTH }
+
+    def __init__(self, filename):
+        """Opens a tournament's results file, creating it if it doesn't exist.
+
+        Each run's result is appended to the file as a line of JSON as soon as
+        it's played, so a tournament that's stopped part way through can pick
+        up where it left off. Runs are keyed by the maze's content hash, so
+        they're found whatever directory the tournament is resumed from. The
+        first line holds the options the runs were played with, as results
+        played with different options can't be compared.
+
+        Arguments:
+            filename -- the path to the results file.
+        """
+        self.filename = filename
+        self.results = dict()
+        self.options = None
+        self.maze_hashes = dict()
+
+        if os.path.exists(filename):
+            with open(filename, 'rb') as f_in:
+                content = f_in.read()
+
+            # A run killed mid-write leaves a partial last line, drop it.
+            complete = content.rfind(b'\n') + 1
+            if complete < len(content):
+                with open(filename, 'r+b') as f_out:
+                    f_out.truncate(complete)
+
+            for line in content[:complete].decode('utf-8').splitlines():
+                result = json.loads(line)
+                if 'options' in result:
+                    self.options = result['options']
+                    continue
+                self.results[Tournament.key(result['mouse'], result['hash'], result['seed'])] = result
+
+    def key(mouse_name, maze_hash, seed):
+        """Identifies a run.
+
+        Arguments:
+            mouse_name -- the name of a mouse class in 'mice'.
+            maze_hash -- the maze's content hash.
+            seed -- the seed for the run.
+        Returns:
+            a hashable key.
+        """
+        return (mouse_name, maze_hash, int(seed))
+
+    def maze_hash(self, maze_file):
+        """Gets the content hash of a maze file, reading each file once.
+        """
+        if maze_file not in self.maze_hashes:
+            self.maze_hashes[maze_file] = Maze(maze_file).content_hash
+
+        return self.maze_hashes[maze_file]
+
+    def check_options(self, max_steps, isolate, budget):
+        """Checks that runs are played with the same options as those already saved.
+
+        Arguments:
+            max_steps -- the maximum number of steps per phase.
+            isolate -- plays each mouse in a separate process.
+            budget -- the most time in ms an isolated mouse's step can take.
+        Returns:
+            the dict of options.
+        """
+        options = { 'max_steps': max_steps, 'isolate': isolate, 'budget': budget }
+        if self.results and self.options is None:
+            raise Exception(f"Can't resume '{self.filename}', it doesn't record the options its runs were played with.")
+        if self.options is not None and self.options != options:
+            raise Exception(f"Can't resume '{self.filename}', its runs were played with {self.options}, not {options}.")
+
+        return options
+
+    def pending(self, mouse_names, maze_files, seeds):
+        """Lists the runs that haven't been played yet.
+
+        Runs are ordered by maze, so that runs sharing a worker tend to share
+        a maze too.
+
+        Arguments:
+            mouse_names -- the names of mouse classes in 'mice'.
+            maze_files -- the paths to the maze files.
+            seeds -- the seeds to play each mouse and maze with.
+        Returns:
+            a list of (mouse_name, maze_file, seed) tuples.
+        """
+        runs = []
+        for maze_file in maze_files:
+            for mouse_name in mouse_names:
+                for seed in seeds:
+                    if Tournament.key(mouse_name, self.maze_hash(maze_file), seed) not in self.results:
+                        runs.append((mouse_name, maze_file, int(seed)))
+
+        return runs
+
+    def play(self, mouse_names, maze_files, seeds, workers=1, max_steps=1000, isolate=False, budget=None):
+        """Plays every run that hasn't been played yet, saving each result as it arrives.
+
+        Arguments:
+            mouse_names -- the names of mouse classes in 'mice'.
+            maze_files -- the paths to the maze files.
+            seeds -- the seeds to play each mouse and maze with.
+            workers -- the number of processes to play runs in.
+            max_steps -- the maximum number of steps per phase.
+            isolate -- plays each mouse in a separate process.
+            budget -- the most time in ms an isolated mouse's step can take.
+        Returns:
+            the number of runs played.
+        """
+        options = self.check_options(max_steps, isolate, budget)
+        runs = self.pending(mouse_names, maze_files, seeds)
+        if not runs:
+            return 0
+
+        with open(self.filename, 'a') as f_out:
+            if self.options is None:
+                self.options = options
+                f_out.write(json.dumps({ 'options': options }) + '\n')
+            if workers > 1:
+                # Results arrive in any order, they're keyed by run.
+                chunksize = max(1, len(runs) // (workers * 16))
+                with multiprocessing.Pool(workers, initializer=init_worker, initargs=(max_steps, isolate, budget)) as pool:
+                    for result in pool.imap_unordered(play_worker, runs, chunksize=chunksize):
+                        self.record(result, f_out)
+            else:
+                init_worker(max_steps, isolate, budget)
+                for run in runs:
+                    self.record(play_worker(run), f_out)
+
+        return len(runs)
+
+    def record(self, result, f_out):
+        """Saves a run's result.
+
+        Arguments:
+            result -- the run's result dict.
+            f_out -- the open results file.
+        """
+        self.results[Tournament.key(result['mouse'], result['hash'], result['seed'])] = result
+        f_out.write(json.dumps(result) + '\n')
+        f_out.flush()
+
+    def summary(self, mouse_names, maze_files, seeds):
+        """Summarises the results of each mouse in each maze.
+
+        Arguments:
+            mouse_names -- the names of mouse classes in 'mice'.
+            maze_files -- the paths to the maze files.
+            seeds -- the seeds each mouse and maze were played with.
+        Returns:
+            a list of dicts with the 'mouse', 'maze', number of 'runs' played,
+            number 'finished', and the 'average' and 'std' of finished scores
+            (None if no runs finished).
+        """
+        rows = []
+        for maze_file in maze_files:
+            for mouse_name in mouse_names:
+                results = [self.results.get(Tournament.key(mouse_name, self.maze_hash(maze_file), s)) for s in seeds]
+                results = [r for r in results if r is not None]
+                scores = np.array([r['score'] for r in results if r['score'] is not None])
+                rows.append({
+                    'mouse': mouse_name,
+                    'maze': os.path.normpath(maze_file),
+                    'runs': len(results),
+                    'finished': len(scores),
+                    'average': float(scores.mean()) if len(scores) else None,
+                    'std': float(scores.std()) if len(scores) else None
+                })
+
+        return rows
+
+    def compare(self, mouse_names, maze_files, seeds):
+        """Compares each pair of mice in each maze, pairing their runs by seed.
+
+        Runs with the same seed give every mouse the same random stream, so
+        any luck both mice share cancels out of the difference. Mice draw
+        from the stream at different rates, though, so their draws soon stop
+        lining up, and the paired interval is often no narrower than the
+        unpaired one. Both are given, so the gain can be checked.
+
+        Arguments:
+            mouse_names -- the names of mouse classes in 'mice'.
+            maze_files -- the paths to the maze files.
+            seeds -- the seeds each mouse and maze were played with.
+        Returns:
+            a list of dicts with the 'mouse' and 'other' mouse, 'maze', number
+            of seeds both finished as 'pairs', the mean score 'difference' of
+            mouse minus other with its confidence interval 'half_width', and
+            the 'unpaired_half_width' from comparing the averages instead. The
+            difference and half-widths are None if there are too few pairs.
+        """
+        rows = []
+        for maze_file in maze_files:
+            scores = dict()
+            for mouse_name in mouse_names:
+                results = [self.results.get(Tournament.key(mouse_name, self.maze_hash(maze_file), s)) for s in seeds]
+                scores[mouse_name] = { r['seed']: r['score'] for r in results if r is not None }
+
+            for i, mouse_name in enumerate(mouse_names):
+                for other_name in mouse_names[i + 1:]:
+                    a, b = stats.paired_scores(scores[mouse_name], scores[other_name])
+                    difference, half_width = stats.mean_ci(a - b)
+
+                    # Compare the averages of the same runs, as if they weren't paired.
+                    unpaired_half_width = None
+                    if len(a) > 1:
+                        unpaired_half_width = stats.z_score() * float(np.sqrt((a.var(ddof=1) + b.var(ddof=1)) / len(a)))
+
+                    rows.append({
+                        'mouse': mouse_name,
+                        'other': other_name,
+                        'maze': os.path.normpath(maze_file),
+                        'pairs': len(a),
+                        'difference': difference,
+                        'half_width': half_width,
+                        'unpaired_half_width': unpaired_half_width
+                    })
+
+        return rows
+
+# Each worker process keeps the mazes it has parsed, and a Runner for each
+# mouse and maze, so they're only built once.
+worker_options = dict()
+worker_mazes = dict()
+worker_runners = dict()
+
+def init_worker(max_steps, isolate=False, budget=None):
+    """Sets up a worker process. Used as a process pool initializer.
+
+    Arguments:
+        max_steps -- the maximum number of steps per phase.
+        isolate -- plays each mouse in a separate process.
+        budget -- the most time in ms an isolated mouse's step can take.
+    """
+    worker_options.update(max_steps=max_steps, isolate=isolate, budget=budget)
+    worker_mazes.clear()
+    worker_runners.clear()
+
+def play_worker(run):
+    """Plays one run in a worker process.
+
+    Arguments:
+        run -- a (mouse_name, maze_file, seed) tuple.
+    Returns:
+        the run's result dict, with its 'mouse', 'maze', maze 'hash' and 'seed'.
+    """
+    mouse_name, maze_file, seed = run
+    if maze_file not in worker_mazes:
+        worker_mazes[maze_file] = Maze(maze_file)
+    maze = worker_mazes[maze_file]
+    if (mouse_name, maze_file) not in worker_runners:
+        worker_runners[(mouse_name, maze_file)] = Runner(maze, mouse_name, Tournament.INIT_STATE, **worker_options)
+
+    result = worker_runners[(mouse_name, maze_file)].run(seed)
+    score = result['score']
+
+    return {
+        'mouse': mouse_name,
+        'maze': maze_file,
+        'hash': maze.content_hash,
+        'seed': seed,
+        'score': float(score) if score else None,
+        'execution_steps': result['execution_steps']
+    }
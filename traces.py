@@ -0,0 +1,247 @@
+import zlib
+import struct
+import numpy as np
+from heading import Heading
+from rotation import Rotation
+from phase import Phase
+
+class Trace:
+    MAGIC = b'RTRC'
+    VERSION = 1
+
+    # Magic, version, initial heading index, dimension, initial x and y,
+    # keyframe interval and the maze's SHA-256 digest, padded to 64 bytes.
+    HEADER = struct.Struct('<4sBB2xIIII32s8x')
+
+    # Keyframes are written after the records, each as its record index and
+    # compressed size, followed by the compressed path counts. The footer at
+    # the very end holds the number of records and the keyframes' offset.
+    KEYFRAME = struct.Struct('<QI')
+    FOOTER = struct.Struct('<QQ4s')
+    FOOTER_MAGIC = b'RKEY'
+
+    # One fixed-width record per step. Position and heading are after the
+    # step, readings are from before it. Rotations are stored as quarter
+    # turns, and rotations or moves that aren't numbers, e.g. 'RESET', as
+    # NOT_A_NUMBER.
+    RECORD = np.dtype([
+        ('phase', 'u1'),
+        ('flags', 'u1'),
+        ('heading', 'u1'),
+        ('rot', 'i1'),
+        ('move', 'i1'),
+        ('step', '<u4'),
+        ('pos', '<u4', (2,)),
+        ('readings', '<u4', (3,))
+    ])
+    NOT_A_NUMBER = -128
+    VALID = 1
+    RESET = 2
+
+    def __init__(self, filename):
+        """Opens a replay trace.
+
+        Records are memory-mapped, so traces of any length open instantly. A
+        trace that was cut short, e.g. by killing the run, can still be read,
+        but has no keyframes.
+
+        Arguments:
+            filename -- the path to the trace file.
+        """
+        with open(filename, 'rb') as f_in:
+            header = f_in.read(self.HEADER.size)
+            if len(header) != self.HEADER.size:
+                raise Exception('Trace header is truncated!')
+            magic, version, heading, dim, x, y, every, digest = self.HEADER.unpack(header)
+            if magic != self.MAGIC:
+                raise Exception(f"File '{filename}' isn't a trace!")
+            if version != self.VERSION:
+                raise Exception(f"Unsupported trace version {version}!")
+
+            # Find the number of records and the keyframes from the footer.
+            size = f_in.seek(0, 2)
+            n, keyframes_offset = (size - self.HEADER.size) // self.RECORD.itemsize, None
+            if size >= self.HEADER.size + self.FOOTER.size:
+                f_in.seek(size - self.FOOTER.size)
+                footer_n, offset, footer_magic = self.FOOTER.unpack(f_in.read(self.FOOTER.size))
+                if footer_magic == self.FOOTER_MAGIC:
+                    n, keyframes_offset = footer_n, offset
+
+            # Read the keyframe positions, leaving the counts compressed until needed.
+            self.keyframes = dict()
+            if keyframes_offset is not None:
+                f_in.seek(keyframes_offset)
+                while f_in.tell() < size - self.FOOTER.size:
+                    index, length = self.KEYFRAME.unpack(f_in.read(self.KEYFRAME.size))
+                    self.keyframes[index] = f_in.read(length)
+
+        self.dim = dim
+        self.init_pos = np.array([x, y], dtype=np.int64)
+
+        # Headings are stored by index, as in Maze.HEADING_INDEX_MAP, i.e. quarter turns from north.
+        self.init_heading = Heading(heading * 90)
+        self.keyframe_every = every
+        self.maze_hash = digest.hex()
+
+        if n > 0:
+            self.records = np.memmap(filename, dtype=self.RECORD, mode='r', offset=self.HEADER.size, shape=(n,))
+        else:
+            self.records = np.zeros(0, dtype=self.RECORD)
+
+    def __len__(self):
+        return len(self.records)
+
+    def state(self, index):
+        """Finds the state of the game before a record, for seeking.
+
+        Starts from the latest keyframe in the same phase and replays the
+        records after it.
+
+        Arguments:
+            index -- the index of the record.
+        Returns:
+            the [x, y] position, Heading and (dim, dim, 2) path counts, as in
+            Trace.add_move, before the record was played.
+        """
+        if not 0 <= index < len(self):
+            raise Exception(f"Record {index} doesn't exist, trace has {len(self)} records.")
+
+        # Find the latest keyframe at or before the record, in the same phase.
+        phase = self.records['phase'][index]
+        keyframes = [k for k in self.keyframes if k <= index and self.records['phase'][k] == phase]
+        if keyframes:
+            start = max(keyframes)
+            counts = np.frombuffer(zlib.decompress(self.keyframes[start]), dtype=np.uint32).reshape(self.dim, self.dim, 2).copy()
+        else:
+            start = int(np.argmax(self.records['phase'] == phase))
+            counts = np.zeros((self.dim, self.dim, 2), dtype=np.uint32)
+
+        # Replay the moves since then.
+        pos = self.pose(start)[0]
+        for i in range(start, index):
+            new_pos = self.records['pos'][i].astype(np.int64)
+            Trace.add_move(counts, pos, new_pos)
+            pos = new_pos
+
+        return pos, self.pose(index)[1], counts
+
+    def pose(self, index):
+        """Finds the mouse's pose before a record.
+
+        Arguments:
+            index -- the index of the record.
+        Returns:
+            the [x, y] position and Heading.
+        """
+        if index == 0 or self.records['phase'][index - 1] != self.records['phase'][index]:
+            return self.init_pos.copy(), self.init_heading
+
+        record = self.records[index - 1]
+        return record['pos'].astype(np.int64), Heading(int(record['heading']) * 90)
+
+    def add_move(counts, from_pos, to_pos):
+        """Counts the passages traversed by a move.
+
+        Arguments:
+            counts -- a (dim, dim, 2) array of traversals, indexed by [x, y, 0]
+                for the passage east of a square and [x, y, 1] for the passage
+                north of it. Updated in place.
+            from_pos -- the [x, y] position before the move.
+            to_pos -- the [x, y] position after the move.
+        """
+        (x1, y1), (x2, y2) = from_pos, to_pos
+        if x1 != x2:
+            counts[min(x1, x2):max(x1, x2), y1, 0] += 1
+        elif y1 != y2:
+            counts[x1, min(y1, y2):max(y1, y2), 1] += 1
+
+class TraceWriter:
+    # Records are written in blocks of this many.
+    BUFFER_SIZE = 1024
+
+    def __init__(self, filename, maze, init_state, keyframe_every=256):
+        """Creates a replay trace, recording a game step by step.
+
+        Arguments:
+            filename -- the path to the trace file.
+            maze -- the Maze being played.
+            init_state -- the mouse's starting state.
+            keyframe_every -- save the path counts every n records, to seek quickly.
+        """
+        self.maze = maze
+        self.keyframe_every = keyframe_every
+        self.f_out = open(filename, 'wb')
+        self.f_out.write(Trace.HEADER.pack(
+            Trace.MAGIC,
+            Trace.VERSION,
+            maze.HEADING_INDEX_MAP[init_state['heading']],
+            maze.dim,
+            int(init_state['pos'][0]),
+            int(init_state['pos'][1]),
+            keyframe_every,
+            bytes.fromhex(maze.content_hash)
+        ))
+
+        self.buffer = np.zeros(self.BUFFER_SIZE, dtype=Trace.RECORD)
+        self.buffered = 0
+        self.n = 0
+        self.keyframes = []
+
+        # Track the path counts of the current phase, for the keyframes.
+        self.init_pos = np.array(init_state['pos'], dtype=np.int64)
+        self.phase = Phase.PLAN
+        self.pos = self.init_pos.copy()
+        self.counts = np.zeros((maze.dim, maze.dim, 2), dtype=np.uint32)
+
+    def record(self, phase, step, pos, heading, readings, rot, move, valid):
+        """Records a step.
+
+        Arguments:
+            phase -- the Phase of the step.
+            step -- the step number within the phase.
+            pos -- the [x, y] position after the step.
+            heading -- the Heading after the step.
+            readings -- the sensor readings the mouse was given.
+            rot -- the mouse's rotation, a Rotation or 'RESET'.
+            move -- the mouse's move, a number or 'RESET'.
+            valid -- True if the step was accepted.
+        """
+        # The path counts start again each phase.
+        if phase != self.phase:
+            self.phase = phase
+            self.pos = self.init_pos.copy()
+            self.counts[:] = 0
+
+        # Save the path counts before the record.
+        if self.n % self.keyframe_every == 0:
+            self.keyframes.append((self.n, zlib.compress(self.counts.tobytes())))
+
+        flags = (Trace.VALID if valid else 0) | (Trace.RESET if rot == 'RESET' else 0)
+        rot = rot.value // 90 if isinstance(rot, Rotation) else Trace.NOT_A_NUMBER
+        if not (isinstance(move, (int, float, np.number)) and move % 1 == 0 and -128 < move < 128):
+            move = Trace.NOT_A_NUMBER
+        self.buffer[self.buffered] = (phase.value, flags, self.maze.HEADING_INDEX_MAP[heading], rot, move, step, pos, readings)
+        self.buffered += 1
+        self.n += 1
+        if self.buffered == self.BUFFER_SIZE:
+            self.flush()
+
+        Trace.add_move(self.counts, self.pos, pos)
+        self.pos = np.array(pos, dtype=np.int64)
+
+    def flush(self):
+        """Writes the buffered records.
+        """
+        self.f_out.write(self.buffer[:self.buffered].tobytes())
+        self.buffered = 0
+
+    def close(self):
+        """Writes the keyframes and closes the trace.
+        """
+        self.flush()
+        offset = self.f_out.tell()
+        for index, counts in self.keyframes:
+            self.f_out.write(Trace.KEYFRAME.pack(index, len(counts)))
+            self.f_out.write(counts)
+        self.f_out.write(Trace.FOOTER.pack(self.n, offset, Trace.FOOTER_MAGIC))
+        self.f_out.close()
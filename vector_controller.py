@@ -0,0 +1,182 @@
+import numpy as np
+from heading import Heading
+from rotation import Rotation
+from phase import Phase
+
+class VectorController:
+    MAX_STEPS = 3
+
+    def __init__(self, mouse_class, maze, init_state, n, max_steps=1000, verbose=False, seeds=None):
+        """Creates a controller that plays many games at once.
+
+        Every game's state is held in arrays and all games are stepped in
+        lockstep, following the same rules as Controller. Mice that implement
+        'next_moves' decide for every game in one call. Other mice get an
+        instance per game and are asked for their 'next_move' in turn.
+
+        Arguments:
+            mouse_class -- the class of Mouse who will navigate the maze.
+            maze -- the Maze to navigate.
+            init_state -- the mouse's starting state.
+            n -- the number of games to play.
+            max_steps -- the maximum number of steps per phase.
+            verbose -- passed to the mice.
+            seeds -- a seed for each game, if any. Each game's mouse is given
+                its own numpy Generator seeded from it, as Runner does for a
+                single game, so its results can be reproduced.
+        """
+        self.mouse_class = mouse_class
+        self.maze = maze
+        self.init_state = init_state
+        self.n = n
+        self.max_steps = max_steps
+        self.verbose = verbose
+        self.seeds = seeds
+
+        # Validate the initial state.
+        if not maze.pos_exists(init_state['pos']):
+            raise Exception(f"Pos {init_state['pos']} doesn't exist in maze.")
+        if not isinstance(init_state['heading'], Heading):
+            raise Exception(f"Heading {init_state['heading']} isn't valid, must be a Heading.")
+
+        # Axial components of each heading, in heading index order.
+        self.components = np.zeros((4, 2), dtype=np.int64)
+        for heading, idx in maze.HEADING_INDEX_MAP.items():
+            self.components[idx] = heading.components()
+
+        # Batch mice decide for all games at once.
+        self.batched = hasattr(mouse_class, 'next_moves')
+
+    def reset(self):
+        """Sets up new games, in the planning phase.
+        """
+        # Create new mice, giving each game its random stream. A batch mouse
+        # also gets one stream seeded from every game's seed, for drawing
+        # for all games at once.
+        if self.batched:
+            self.mouse = self.mouse_class(self.maze.dim, self.init_state, self.verbose)
+            if self.seeds is not None:
+                self.mouse.rng = np.random.default_rng(self.seeds)
+                self.mouse.rngs = [np.random.default_rng(s) for s in self.seeds]
+        else:
+            self.mice = [self.mouse_class(self.maze.dim, self.init_state, self.verbose) for _ in range(self.n)]
+            if self.seeds is not None:
+                for mouse, seed in zip(self.mice, self.seeds):
+                    mouse.rng = np.random.default_rng(seed)
+
+        # Reset the mouse states.
+        self.init_pos = np.array(self.init_state['pos'], dtype=np.int64)
+        self.init_heading = self.maze.HEADING_INDEX_MAP[self.init_state['heading']]
+        self.positions = np.tile(self.init_pos, (self.n, 1))
+        self.headings = np.full(self.n, self.init_heading, dtype=np.int64)
+
+        # Reset the phases and step counters, which start at -1 like Controller.
+        self.phases = np.full(self.n, Phase.PLAN.value, dtype=np.int64)
+        self.steps = np.zeros((self.n, 2), dtype=np.int64)
+        self.steps[:, Phase.PLAN.value] = -1
+
+        # Reset the flags.
+        self.reached_goal = np.zeros(self.n, dtype=bool)
+        self.finished = np.zeros(self.n, dtype=bool)
+        self.done = np.zeros(self.n, dtype=bool)
+
+    def run(self):
+        """Plays every game until it finishes or runs out of steps.
+
+        Returns:
+            an (n,) boolean numpy array, True for games the mouse completed.
+        """
+        self.reset()
+        while not self.done.all():
+            self.step()
+
+        return self.finished
+
+    def step(self):
+        """Runs one step of every game that hasn't finished.
+        """
+        active = ~self.done
+        games = np.arange(self.n)
+        self.steps[games[active], self.phases[active]] += 1
+
+        # Get sensor readings.
+        readings = self.maze.sensor_readings_batch(self.positions, self.headings)
+
+        # Get the mice's desired moves.
+        rots, moves, resets = self.next_moves(readings, active)
+
+        # Check which mice have finished planning. Resetting during execution
+        # isn't a valid move, so those steps are wasted.
+        planning = self.phases == Phase.PLAN.value
+        resetting = active & resets
+        planned = resetting & planning & self.reached_goal
+
+        # Validate the mice's responses.
+        valid = active & ~resets & np.isin(rots, [r.value for r in Rotation])
+        valid &= (moves >= -self.MAX_STEPS) & (moves <= self.MAX_STEPS)
+
+        # Are the moves valid given the structure of the maze?
+        new_headings = (self.headings + rots // 90) % 4
+        valid[valid] = self.maze.valid_move_batch(self.positions[valid], new_headings[valid], moves[valid])
+
+        # Update the mouse states.
+        self.headings[valid] = new_headings[valid]
+        self.positions[valid] += moves[valid, None] * self.components[new_headings[valid]]
+
+        # Check if mice have reached the goal, and completed the final run.
+        arrived = valid & ~self.reached_goal & self.maze.goal_mask[self.positions[:, 0], self.positions[:, 1]]
+        self.reached_goal |= arrived
+        self.finished |= arrived & ~planning
+        self.done |= self.finished
+
+        # Start the execution run for mice that finished planning.
+        self.phases[planned] = Phase.EXECUTE.value
+        self.steps[planned, Phase.EXECUTE.value] = -1
+        self.positions[planned] = self.init_pos
+        self.headings[planned] = self.init_heading
+        self.reached_goal[planned] = False
+
+        # Games that have taken too long are over.
+        self.done |= self.steps[games, self.phases] >= self.max_steps - 1
+
+    def next_moves(self, readings, active):
+        """Gets the next move of every mouse.
+
+        Arguments:
+            readings -- an (n, 3) numpy array of sensor readings.
+            active -- an (n,) boolean numpy array, True for games still running.
+        Returns:
+            (n,) numpy arrays of rotations in degrees, moves and resets. Invalid
+            rotations are marked with a rotation of 1, which is never valid.
+        """
+        if self.batched:
+            rots, moves, resets = self.mouse.next_moves(readings)
+            return np.asarray(rots, dtype=np.int64), np.asarray(moves, dtype=np.int64), np.asarray(resets, dtype=bool)
+
+        rots = np.ones(self.n, dtype=np.int64)
+        moves = np.zeros(self.n, dtype=np.int64)
+        resets = np.zeros(self.n, dtype=bool)
+        for i in np.flatnonzero(active):
+            rot, move = self.mice[i].next_move(tuple(readings[i].tolist()))
+
+            # Convert the move to arrays, leaving invalid moves out.
+            if (rot, move) == ('RESET', 'RESET'):
+                resets[i] = True
+            elif isinstance(rot, Rotation) and move % 1 == 0:
+                rots[i], moves[i] = rot.value, move
+
+        return rots, moves, resets
+
+    def scores(self):
+        """Calculates the mice's scores for each game.
+
+        Returns:
+            an (n,) numpy array of scores, NaN for games that weren't completed.
+        """
+        # Steps in the planning round aren't penalised as highly.
+        plan_mult = 1 / 30
+
+        # Calculate the score.
+        scores = self.steps[:, Phase.EXECUTE.value] + plan_mult * self.steps[:, Phase.PLAN.value]
+
+        return np.where(self.finished, scores, np.nan)